@@ -0,0 +1,120 @@
+import asyncio
+import multiprocessing
+import resource
+import time
+from pyrogram import Client, raw, types
+from forward import ForwardBot
+
+# Offline microbenchmarks, no network access or session needed.
+#   python bench.py
+MESSAGE_COUNT = 10000
+CHANNEL_ID = 1001
+SCAN_MESSAGE_COUNT = 3000000
+SCAN_CACHED_COUNT = 1000000
+SCAN_CHUNK_SIZE = 5000
+
+
+def _make_raw_message(msg_id: int):
+    """Build a synthetic channel message, alternating text and photo"""
+    media = None
+    if msg_id % 2:
+        media = raw.types.MessageMediaPhoto(
+            photo=raw.types.Photo(
+                id=msg_id,
+                access_hash=msg_id,
+                file_reference=b"file_reference",
+                date=1700000000,
+                sizes=[raw.types.PhotoSize(type="y", w=1280, h=720, size=150000)],
+                dc_id=2
+            )
+        )
+    return raw.types.Message(
+        id=msg_id,
+        peer_id=raw.types.PeerChannel(channel_id=CHANNEL_ID),
+        date=1700000000,
+        message=f"Message {msg_id} with some text",
+        media=media,
+        entities=[raw.types.MessageEntityBold(offset=0, length=7)]
+    )
+
+
+async def bench_forward_paths():
+    """CPU time per 10k messages: Message object parsing vs raw send request building"""
+    client = Client("bench", in_memory=True, no_updates=True)
+    channel = raw.types.Channel(
+        id=CHANNEL_ID,
+        title="Bench",
+        photo=raw.types.ChatPhotoEmpty(),
+        date=1700000000,
+        access_hash=1,
+        restriction_reason=[]
+    )
+    chats = {CHANNEL_ID: channel}
+    dest_peer = raw.types.InputPeerChannel(channel_id=CHANNEL_ID + 1, access_hash=2)
+    raw_messages = [_make_raw_message(i) for i in range(1, MESSAGE_COUNT + 1)]
+
+    start = time.process_time()
+    for raw_msg in raw_messages:
+        await types.Message._parse(client, raw_msg, {}, chats, replies=0)
+    parsed_cpu = time.process_time() - start
+
+    start = time.process_time()
+    for raw_msg in raw_messages:
+        ForwardBot._build_raw_send_request(raw_msg, dest_peer, random_id=raw_msg.id).write()
+    raw_cpu = time.process_time() - start
+
+    print(f"Forward paths, CPU time per {MESSAGE_COUNT} messages:")
+    print(f"• pyrogram Message objects: {parsed_cpu:.3f}s")
+    print(f"• raw TL fast path:         {raw_cpu:.3f}s")
+
+
+def _make_scan_data():
+    """Cached IDs ascending plus new scan chunks sorted descending, as GetHistory returns them"""
+    cached_ids = list(range(1, SCAN_CACHED_COUNT + 1))
+    chunks = [
+        list(range(min(start + SCAN_CHUNK_SIZE - 1, SCAN_MESSAGE_COUNT), start - 1, -1))
+        for start in range(SCAN_CACHED_COUNT + 1, SCAN_MESSAGE_COUNT + 1, SCAN_CHUNK_SIZE)
+    ]
+    return cached_ids, chunks
+
+
+def _assemble_extend_set_sort(cached_ids, chunks):
+    scan_results = []
+    for chunk in chunks:
+        scan_results.extend(chunk)
+    new_message_ids = sorted(list(set(scan_results)))
+    return sorted(list(set(cached_ids + new_message_ids)))
+
+
+def _assemble_merge(cached_ids, chunks):
+    return ForwardBot._merge_sorted_ids(cached_ids, chunks)
+
+
+def _run_scan_assembly(name, results):
+    cached_ids, chunks = _make_scan_data()
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    assemble = _assemble_merge if name == 'merge' else _assemble_extend_set_sort
+    start = time.perf_counter()
+    message_ids = assemble(cached_ids, chunks)
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results[name] = (elapsed, (peak_rss - base_rss) / 1024, len(message_ids))
+
+
+def bench_scan_assembly():
+    """Time and peak RSS above the input data for scan result assembly, one process per variant"""
+    manager = multiprocessing.Manager()
+    results = manager.dict()
+    for name in ('extend_set_sort', 'merge'):
+        process = multiprocessing.Process(target=_run_scan_assembly, args=(name, results))
+        process.start()
+        process.join()
+
+    print(f"Scan assembly, {SCAN_CACHED_COUNT} cached + {SCAN_MESSAGE_COUNT - SCAN_CACHED_COUNT} scanned IDs:")
+    for name, (elapsed, peak_mb, count) in results.items():
+        print(f"• {name}: {elapsed:.2f}s, +{peak_mb:.0f} MB peak RSS ({count} IDs)")
+
+
+if __name__ == "__main__":
+    asyncio.run(bench_forward_paths())
+    bench_scan_assembly()
@@ -4,33 +4,73 @@ import tempfile
 import os
 import json
 from typing import List, Dict, Optional
-from pyrogram import Client, raw
+from pyrogram import Client, raw, filters, utils
 from pyrogram.types import Message
+from pyrogram.handlers import MessageHandler
 from pyrogram.errors import FloodWait, RPCError
-from collections import deque
+from collections import deque, Counter
 import time
 
 class CombinedLinkForwarder:
+    LINK_PATTERN = re.compile(r'(?:https?://)?(?:t\.me/|telegram\.me/)([a-zA-Z0-9_]+)\?start=([a-zA-Z0-9_-]+)')
+    LINK_DOCUMENT_EXTENSIONS = ('.txt', '.html', '.htm', '.json')
+    FETCH_SLICE_SIZE = 200  # get_messages accepts at most 200 IDs per call
+
     def __init__(self, bot: Client):
         self.bot = bot
         self.temp_dir = tempfile.mkdtemp(prefix="temp_cl_data_")
         os.makedirs(self.temp_dir, exist_ok=True)
         self.clean_temp_dir()
         
+        # Append-only journal of link/forward/delete state, kept across restarts
+        self.data_dir = "temp_cl_data"
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.journal_file = os.path.join(self.data_dir, "journal.jsonl")
+        self.seen_links_file = os.path.join(self.data_dir, "seen_links.jsonl")
+        self.bot_profiles_file = os.path.join(self.data_dir, "bot_profiles.json")
+        
         # Worker configuration
         self.worker_config = {
-            'link_processor': 1,
+            'link_processor': 5,  # Links for different bots run in parallel up to this limit
             'forwarders': 3,
             'deleter': 1
         }
         
-        # Worker queues
-        self.link_queue = asyncio.Queue()
-        self.forward_queue = asyncio.Queue()
-        self.delete_queue = asyncio.Queue()
+        # Worker queues, bounded so a slow stage pauses the one feeding it
+        self.queue_limits = {
+            'link': 20,
+            'forward': 500,
+            'delete': 500
+        }
+        self.link_queue = asyncio.Queue(maxsize=self.queue_limits['link'])
+        self.forward_queue = asyncio.Queue(maxsize=self.queue_limits['forward'])
+        self.delete_queue = asyncio.Queue(maxsize=self.queue_limits['delete'])
+        
+        # Collected links wait here until the link feeder can queue them, so collection never blocks
+        self.link_backlog = deque()
+        self.link_backlog_ready = asyncio.Event()
+        
+        # Set when every collected link, forward and delete has been resolved
+        self.all_done = asyncio.Event()
+        
+        # Forward tasks are enqueued in sequence order and sent in that order
+        self.enqueue_lock = asyncio.Lock()
+        self.send_turn = asyncio.Condition()
+        
+        # Message IDs of each link mapped to their fetch slice, fetched in bulk by the first forwarder reaching it
+        self.message_batches = {}
+        
+        # Target bots with a link in progress, mapped to links parked behind it
+        self.active_bots = {}
+        
+        # Chats with pending last message ID requests, answered together by one poller per tick
+        self.last_id_waiters = {}
+        self.last_id_poller = None
         
         # Worker tasks
         self.workers = {
+            'resume_feeder': [],
+            'link_feeder': [],
             'link_processor': [],
             'forwarders': [],
             'deleter': []
@@ -47,6 +87,14 @@ class CombinedLinkForwarder:
             'total_links': 0,
             'processed_links': 0,
             'collected_links': 0,
+            'outstanding_sequences': deque(),
+            'session_links': set(),
+            'in_flight': 0,
+            'status_msg': None,
+            'status_report': None,
+            'status_events': deque(maxlen=8),
+            'last_status_edit': 0,
+            'status_flood_until': 0,
             'stats': {
                 'links_processed': 0,
                 'messages_forwarded': 0,
@@ -55,7 +103,8 @@ class CombinedLinkForwarder:
                 'current_link': None,
                 'current_link_messages': 0,
                 'pending_deletions': 0,
-                'pending_forwards': 0
+                'pending_forwards': 0,
+                'blocked': {'link': 0.0, 'forward': 0.0, 'delete': 0.0}
             }
         }
         
@@ -64,8 +113,38 @@ class CombinedLinkForwarder:
             'initial_wait': 10,
             'stabilization_checks': 12,
             'progress_update_interval': 10,
-            'completion_delay': 3
+            'status_edit_interval': 5,
+            'quiet_period': 3,
+            'reply_timeout': 30,
+            'delete_batch_size': 100,
+            'delete_linger': 2,
+            'poll_tick': 0.5,
+            'seen_link_ttl': 7 * 24 * 3600,
+            # Per-bot waits, learned from recorded reply latencies and gaps between replies
+            'profile_samples': 50,
+            'profile_min_samples': 5,
+            'min_quiet_period': 0.5,
+            'max_quiet_period': 15
         }
+        
+        # Reply latency and inter-message gap samples per target bot
+        self.bot_profiles = self._load_bot_profiles()
+        
+        # Target bot chats known to refuse copies, their media goes straight to download/upload
+        self.restricted_chats = set()
+        
+        # (bot, start_param) pairs already processed in earlier sessions
+        self.seen_links = self._load_seen_links()
+        
+        # Target bot chats being waited on, updated from incoming messages
+        self.watched_chats = {}
+        self.bot.add_handler(
+            MessageHandler(
+                self._on_watched_chat_message,
+                filters.create(lambda _, __, m: bool(m.chat) and m.chat.id in self.watched_chats)
+            ),
+            group=2
+        )
 
     def clean_temp_dir(self):
         """Clean up temp directory"""
@@ -81,30 +160,177 @@ class CombinedLinkForwarder:
             print(f"Error cleaning temp dir: {e}")
 
     async def send_status(self, text: str):
-        """Send status updates to user"""
+        """Send status updates to user, errors as own messages and the rest merged into one status message"""
+        if not self.state['status_chat_id']:
+            return
+        if text.startswith(('⚠️', '❌', '🚨')):
+            await self._send_separate(text)
+            return
+        self.state['status_events'].append(f"{time.strftime('%H:%M:%S')} {text}")
+        await self._update_status_message()
+
+    async def _send_separate(self, text: str):
+        """Send a standalone message to the user"""
         if self.state['status_chat_id']:
             try:
                 await self.bot.send_message(self.state['status_chat_id'], text)
             except Exception:
                 pass
 
+    async def _update_status_message(self, force: bool = False):
+        """Edit the pinned status message with the latest report and events, at most once per interval"""
+        now = time.time()
+        # A FloodWait holds off every edit, forced ones included
+        if now < self.state['status_flood_until']:
+            return
+        if not force and now - self.state['last_status_edit'] < self.settings['status_edit_interval']:
+            return
+        self.state['last_status_edit'] = now
+
+        parts = []
+        if self.state['status_report']:
+            parts.append(self.state['status_report'])
+        if self.state['status_events']:
+            parts.append("📝 Recent:\n" + "\n".join(self.state['status_events']))
+        text = "\n\n".join(parts)
+        if not text:
+            return
+
+        try:
+            if self.state['status_msg']:
+                try:
+                    await self.state['status_msg'].edit_text(text)
+                    return
+                except FloodWait:
+                    raise
+                except RPCError as e:
+                    if "MESSAGE_NOT_MODIFIED" in str(e):
+                        return
+                    # Status message is gone, send a new one below
+            self.state['status_msg'] = await self.bot.send_message(self.state['status_chat_id'], text)
+            try:
+                await self.state['status_msg'].pin(disable_notification=True)
+            except Exception:
+                pass
+        except FloodWait as e:
+            self.state['status_flood_until'] = now + e.value
+        except Exception:
+            pass
+
     def extract_links(self, text: str) -> list:
         """Extract t.me bot links from text"""
         if not text:
             return []
-        pattern = r'(?:https?://)?(?:t\.me/|telegram\.me/)([a-zA-Z0-9_]+)\?start=([a-zA-Z0-9_-]+)'
         return [f"https://t.me/{m.group(1)}?start={m.group(2)}" 
-               for m in re.finditer(pattern, text)]
+               for m in self.LINK_PATTERN.finditer(text)]
 
-    async def _get_last_message_id(self, chat_id: int) -> Optional[int]:
-        """Get last message ID in chat"""
+    async def extract_document_links(self, message: Message) -> list:
+        """Download an uploaded .txt/.html/.json export and stream-extract its links"""
+        file_name = (message.document.file_name or "").lower()
+        if not file_name.endswith(self.LINK_DOCUMENT_EXTENSIONS):
+            return []
+        path = await message.download(file_name=os.path.join(self.temp_dir, f"links_{message.id}"))
+        links = []
         try:
-            async for message in self.bot.get_chat_history(chat_id, limit=1):
-                if message and not message.empty:
-                    return message.id
-        except Exception as e:
-            await self.send_status(f"⚠️ Error getting last message ID: {str(e)}")
-            return None
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    # JSON exports escape slashes in URLs
+                    links.extend(self.extract_links(line.replace('\\/', '/')))
+        finally:
+            try:
+                os.unlink(path)
+            except Exception as e:
+                print(f"Error deleting temp file {path}: {e}")
+        return links
+
+    async def _get_last_message_id(self, chat_id: int) -> Optional[int]:
+        """Get last message ID in chat, 0 for an empty chat"""
+        future = asyncio.get_event_loop().create_future()
+        self.last_id_waiters.setdefault(chat_id, []).append(future)
+        if self.last_id_poller is None or self.last_id_poller.done():
+            self.last_id_poller = asyncio.create_task(self._last_message_poller())
+        return await future
+
+    async def _last_message_poller(self):
+        """Answer all pending last message ID requests with one GetPeerDialogs call per tick"""
+        while self.last_id_waiters:
+            await asyncio.sleep(self.settings['poll_tick'])
+            waiters, self.last_id_waiters = self.last_id_waiters, {}
+            top_messages = await self._get_top_messages(list(waiters))
+            for chat_id, futures in waiters.items():
+                for future in futures:
+                    if not future.done():
+                        future.set_result(top_messages.get(chat_id))
+
+    async def _get_top_messages(self, chat_ids: List[int]) -> Dict[int, Optional[int]]:
+        """Top message ID per chat from its dialog, 100 peers per call, None for chats that failed"""
+        top_messages = {}
+        for i in range(0, len(chat_ids), 100):
+            peers = {}
+            for chat_id in chat_ids[i:i + 100]:
+                try:
+                    peers[chat_id] = raw.types.InputDialogPeer(peer=await self.bot.resolve_peer(chat_id))
+                except Exception as e:
+                    top_messages[chat_id] = None
+                    await self.send_status(f"⚠️ Error getting last message ID of {chat_id}: {str(e)}")
+            if not peers:
+                continue
+            try:
+                while True:
+                    try:
+                        result = await self.bot.invoke(raw.functions.messages.GetPeerDialogs(peers=list(peers.values())))
+                        break
+                    except FloodWait as e:
+                        await asyncio.sleep(e.value)
+            except Exception as e:
+                top_messages.update(dict.fromkeys(peers))
+                await self.send_status(f"⚠️ Error getting last message ID: {str(e)}")
+                continue
+            # No dialog yet means an empty chat
+            top_messages.update(dict.fromkeys(peers, 0))
+            for dialog in result.dialogs:
+                top_messages[utils.get_peer_id(dialog.peer)] = dialog.top_message
+        return top_messages
+
+    async def _get_message_range(self, chat_id: int, min_id: int, max_id: int) -> Dict[int, dict]:
+        """Fetch IDs and forwarding metadata of messages in (min_id, max_id] with bounded raw GetHistory calls"""
+        peer = await self.bot.resolve_peer(chat_id)
+        messages = {}
+        offset_id = max_id + 1
+        page_size = 100
+        while offset_id > min_id + 1:
+            try:
+                result = await self.bot.invoke(
+                    raw.functions.messages.GetHistory(
+                        peer=peer,
+                        offset_id=offset_id,
+                        offset_date=0,
+                        add_offset=0,
+                        limit=page_size,
+                        max_id=max_id + 1,
+                        min_id=min_id,
+                        hash=0
+                    ),
+                    sleep_threshold=10
+                )
+            except FloodWait as e:
+                await asyncio.sleep(e.value)
+                continue
+
+            page = [msg for msg in getattr(result, 'messages', []) if min_id < msg.id <= max_id]
+            if not page:
+                break
+            for msg in page:
+                if isinstance(msg, raw.types.Message) and not msg.out:
+                    messages[msg.id] = {
+                        'media': msg.media is not None and not isinstance(msg.media, raw.types.MessageMediaWebPage),
+                        'grouped_id': msg.grouped_id,
+                        'noforwards': bool(msg.noforwards)
+                    }
+            offset_id = min(msg.id for msg in page)
+            if len(result.messages) < page_size:
+                break
+        return messages
 
     async def _resolve_username(self, username: str):
         """Resolve username to chat ID"""
@@ -115,303 +341,774 @@ class CombinedLinkForwarder:
             await self.send_status(f"⚠️ Error resolving @{username}: {str(e)}")
             return None
 
-    async def _wait_for_stabilization(self, chat_id: int, initial_msg_id: int) -> Optional[int]:
-        """Wait for message flow to stabilize"""
-        last_msg_id = initial_msg_id
-        checks_done = 0
-        
-        while checks_done < self.settings['stabilization_checks']:
-            await asyncio.sleep(self.settings['initial_wait'])
+    async def _on_watched_chat_message(self, client: Client, message: Message):
+        """Track the newest message, and the newest one from the bot, of a watched bot chat"""
+        watch = self.watched_chats.get(message.chat.id)
+        if watch:
+            if not message.outgoing and message.id > watch['last_incoming_id']:
+                watch['arrivals'].append(time.monotonic())
+                watch['last_incoming_id'] = message.id
+            watch['last_id'] = max(watch['last_id'], message.id)
+            watch['event'].set()
+
+    def _watch_chat(self, chat_id: int):
+        """Start receiving message updates for a bot chat"""
+        self.watched_chats[chat_id] = {'last_id': 0, 'last_incoming_id': 0, 'event': asyncio.Event(), 'arrivals': []}
+
+    def _unwatch_chat(self, chat_id: int):
+        """Stop receiving message updates for a bot chat"""
+        self.watched_chats.pop(chat_id, None)
+
+    async def _wait_for_stabilization(self, chat_id: int, initial_msg_id: int,
+                                      quiet_period: float = None) -> Optional[int]:
+        """Wait until no new message arrives for quiet_period, confirming with a poll"""
+        quiet_period = quiet_period or self.settings['quiet_period']
+        watch = self.watched_chats[chat_id]
+        watch['last_id'] = max(watch['last_id'], initial_msg_id)
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.settings['initial_wait'] * self.settings['stabilization_checks']
+
+        while loop.time() < deadline:
+            watch['event'].clear()
+            try:
+                await asyncio.wait_for(
+                    watch['event'].wait(),
+                    min(quiet_period, max(0, deadline - loop.time()))
+                )
+                continue  # New message, restart the quiet period
+            except asyncio.TimeoutError:
+                pass
+
+            # Quiet period passed, poll once in case updates were missed
             current_msg_id = await self._get_last_message_id(chat_id)
-            
             if current_msg_id is None:
                 return None
-                
-            if current_msg_id == last_msg_id:
-                return last_msg_id
-                
-            last_msg_id = current_msg_id
-            checks_done += 1
-            
-            await self.send_status(
-                f"🔍 Stabilization check {checks_done}/{self.settings['stabilization_checks']} "
-                f"New messages detected (ID: {current_msg_id})"
-            )
-        
-        return last_msg_id
+            if current_msg_id <= watch['last_id']:
+                return watch['last_id']
+            watch['last_id'] = current_msg_id
+
+        return watch['last_id']
+
+    async def _wait_for_reply(self, chat_id: int, baseline_msg_id: int, timeout: float = None) -> Optional[int]:
+        """Wait for the bot's first message after baseline_msg_id, the /start message, polling as fallback"""
+        watch = self.watched_chats[chat_id]
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + (timeout or self.settings['reply_timeout'])
+
+        while watch['last_incoming_id'] <= baseline_msg_id and loop.time() < deadline:
+            watch['event'].clear()
+            try:
+                await asyncio.wait_for(
+                    watch['event'].wait(),
+                    min(self.settings['initial_wait'], max(0, deadline - loop.time()))
+                )
+            except asyncio.TimeoutError:
+                # Only the bot writes after our /start, so anything newer is its reply
+                current_msg_id = await self._get_last_message_id(chat_id)
+                if current_msg_id is None:
+                    return None
+                if current_msg_id > baseline_msg_id:
+                    watch['last_incoming_id'] = max(watch['last_incoming_id'], current_msg_id)
+                watch['last_id'] = max(watch['last_id'], current_msg_id)
 
-    async def _save_link_data(self, link: str):
-        """Save link to processing queue file"""
-        links_file = os.path.join(self.temp_dir, "links_queue.json")
+        return max(watch['last_incoming_id'], baseline_msg_id)
+
+    @staticmethod
+    def _get_sent_message_id(updates) -> Optional[int]:
+        """Extract the ID of our own new message from an Updates result"""
+        if isinstance(updates, raw.types.UpdateShortSentMessage):
+            return updates.id
+        for update in getattr(updates, 'updates', []):
+            if isinstance(update, raw.types.UpdateNewMessage) and update.message.out:
+                return update.message.id
+        for update in getattr(updates, 'updates', []):
+            if isinstance(update, raw.types.UpdateMessageID):
+                return update.id
+        return None
+
+    def _load_bot_profiles(self) -> Dict[str, dict]:
+        """Load recorded response-time samples per bot"""
+        if os.path.exists(self.bot_profiles_file):
+            try:
+                with open(self.bot_profiles_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Bot profiles load error: {e}")
+        return {}
+
+    def _record_bot_timing(self, username: str, invoked_at: float, arrivals: List[float]):
+        """Record a bot's reply latency and the gaps between its replies, then persist the profiles"""
+        if not arrivals:
+            return
+        profile = self.bot_profiles.setdefault(username.lower(), {'latencies': [], 'gaps': []})
+        profile['latencies'].append(round(arrivals[0] - invoked_at, 3))
+        profile['gaps'].extend(round(later - earlier, 3) for earlier, later in zip(arrivals, arrivals[1:]))
+        for key in ('latencies', 'gaps'):
+            del profile[key][:-self.settings['profile_samples']]
         try:
-            data = []
-            if os.path.exists(links_file):
-                with open(links_file, 'r') as f:
-                    data = json.load(f)
-            
-            data.append(link)
-            
-            with open(links_file, 'w') as f:
-                json.dump(data, f)
+            with open(self.bot_profiles_file, 'w') as f:
+                json.dump(self.bot_profiles, f)
         except Exception as e:
-            await self.send_status(f"⚠️ Error saving link data: {str(e)}")
+            print(f"Bot profiles save error: {e}")
+
+    @staticmethod
+    def _percentile(values: List[float], fraction: float) -> float:
+        """Nearest-rank percentile of a non-empty list"""
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
 
-    async def _save_messages_to_forward(self, username: str, messages: List[int]):
-        """Save messages to forward queue file"""
-        messages_file = os.path.join(self.temp_dir, "messages_to_forward.json")
+    def _bot_waits(self, username: str) -> Dict[str, float]:
+        """Reply timeout and quiet period for a bot, defaults until enough samples are recorded"""
+        waits = {'reply_timeout': self.settings['reply_timeout'], 'quiet_period': self.settings['quiet_period']}
+        profile = self.bot_profiles.get(username.lower())
+        if not profile:
+            return waits
+        if len(profile['latencies']) >= self.settings['profile_min_samples']:
+            # Only ever lengthen the reply timeout, a bot that sometimes answers late must not be cut off
+            waits['reply_timeout'] = max(waits['reply_timeout'], 2 * self._percentile(profile['latencies'], 0.95))
+        if len(profile['gaps']) >= self.settings['profile_min_samples']:
+            # Twice the 95th percentile gap, leaving room for the observed gaps to grow past the current wait
+            waits['quiet_period'] = min(self.settings['max_quiet_period'], max(
+                self.settings['min_quiet_period'], 2 * self._percentile(profile['gaps'], 0.95)
+            ))
+        return waits
+
+    def _journal(self, event: str, **fields):
+        """Append a state change to the journal"""
         try:
-            data = []
-            if os.path.exists(messages_file):
-                with open(messages_file, 'r') as f:
-                    data = json.load(f)
-            
-            for msg_id in messages:
-                data.append({
-                    'username': username,
-                    'message_id': msg_id,
-                    'sequence': self.state['current_sequence'],
-                    'status': 'pending'
-                })
-                self.state['current_sequence'] += 1
-            
-            with open(messages_file, 'w') as f:
-                json.dump(data, f)
+            with open(self.journal_file, 'a') as f:
+                f.write(json.dumps({'event': event, **fields}) + "\n")
         except Exception as e:
-            await self.send_status(f"⚠️ Error saving messages to forward: {str(e)}")
+            print(f"Journal write error: {e}")
 
-    async def _save_messages_to_delete(self, username: str, messages: List[int]):
-        """Save messages to delete queue file"""
-        delete_file = os.path.join(self.temp_dir, "messages_to_delete.json")
+    def _clear_journal(self):
+        """Remove the journal once a batch is finished or cancelled"""
         try:
-            data = []
-            if os.path.exists(delete_file):
-                with open(delete_file, 'r') as f:
-                    data = json.load(f)
-            
-            for msg_id in messages:
-                data.append({
-                    'username': username,
-                    'message_id': msg_id
-                })
-            
-            with open(delete_file, 'w') as f:
-                json.dump(data, f)
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
         except Exception as e:
-            await self.send_status(f"⚠️ Error saving messages to delete: {str(e)}")
+            print(f"Journal remove error: {e}")
+
+    @staticmethod
+    def _link_key(link: str) -> str:
+        """Normalized bot/start_param key of a start link"""
+        username = link.split('/')[3].split('?')[0]
+        return f"{username.lower()}?start={link.split('start=')[1]}"
+
+    def _load_seen_links(self) -> Dict[str, dict]:
+        """Load processed links still within the TTL, compacting the file when entries expired"""
+        seen = {}
+        if not os.path.exists(self.seen_links_file):
+            return seen
+        expired = False
+        cutoff = time.time() - self.settings['seen_link_ttl']
+        try:
+            with open(self.seen_links_file, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry['time'] < cutoff:
+                        expired = True
+                        continue
+                    seen[entry['key']] = entry
+            if expired:
+                with open(self.seen_links_file, 'w') as f:
+                    for entry in seen.values():
+                        f.write(json.dumps(entry) + "\n")
+        except Exception as e:
+            print(f"Seen links load error: {e}")
+        return seen
+
+    def _remember_link(self, link: str, outcome: str, messages: int = 0):
+        """Record a processed link and its outcome"""
+        entry = {'key': self._link_key(link), 'outcome': outcome, 'messages': messages, 'time': time.time()}
+        self.seen_links[entry['key']] = entry
+        try:
+            with open(self.seen_links_file, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+        except Exception as e:
+            print(f"Seen links write error: {e}")
+
+    def _is_duplicate_link(self, link: str) -> bool:
+        """Whether a link is already collected this session or processed within the TTL"""
+        key = self._link_key(link)
+        if key in self.state['session_links']:
+            return True
+        entry = self.seen_links.get(key)
+        if (entry and entry['outcome'] != 'failed' and
+                entry['time'] >= time.time() - self.settings['seen_link_ttl']):
+            return True
+        return False
+
+    async def _save_link_data(self, links: List[str]):
+        """Record collected links in one journal write"""
+        try:
+            with open(self.journal_file, 'a') as f:
+                f.writelines(json.dumps({'event': 'link', 'link': link}) + "\n" for link in links)
+        except Exception as e:
+            print(f"Journal write error: {e}")
+
+    async def _save_messages_to_forward(self, username: str, chat_id: int, messages: List[int],
+                                        meta: Dict[int, dict] = None) -> List[Dict]:
+        """Record messages to forward and return their forward tasks in sequence order"""
+        tasks = []
+        batch_key = f"{chat_id}:{self.state['current_sequence']}"
+        self._register_batch(batch_key, chat_id, list(messages))
+        for msg_id in messages:
+            task = {
+                'username': username,
+                'message_id': msg_id,
+                'chat_id': chat_id,
+                'sequence': self.state['current_sequence'],
+                'batch': batch_key,
+                **(meta or {}).get(msg_id, {})
+            }
+            self._journal('forward', **task)
+            self.state['outstanding_sequences'].append(task['sequence'])
+            tasks.append(task)
+            self.state['current_sequence'] += 1
+        return tasks
+
+    async def _save_forward_result(self, task: Dict, success: bool):
+        """Record a forward outcome in the journal"""
+        self._journal('forwarded' if success else 'forward_failed',
+                      username=task['username'], chat_id=task['chat_id'], message_id=task['message_id'])
+
+    async def _save_delete_result(self, task: Dict, success: bool):
+        """Record a delete outcome"""
+        self._journal('deleted', chat_id=task['chat_id'], message_id=task['message_id'], success=success)
+
+    async def resume_from_journal(self):
+        """Rebuild queues from the journal left by an interrupted batch and resume it"""
+        if not os.path.exists(self.journal_file):
+            return
+        session = None
+        processing = False
+        links = []
+        links_done = Counter()
+        forwards = {}
+        deletes = {}
+        stats = {'messages_forwarded': 0, 'messages_failed': 0, 'messages_deleted': 0}
+        try:
+            with open(self.journal_file, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Partially written last line
+                    event = entry.pop('event')
+                    if event == 'session':
+                        session = entry
+                    elif event == 'processing':
+                        processing = True
+                    elif event == 'link':
+                        links.append(entry['link'])
+                    elif event == 'link_done':
+                        links_done[entry['link']] += 1
+                    elif event == 'forward':
+                        forwards[(entry['chat_id'], entry['message_id'])] = entry
+                    elif event in ('forwarded', 'forward_failed'):
+                        forwards.pop((entry['chat_id'], entry['message_id']), None)
+                        if event == 'forwarded':
+                            deletes[(entry['chat_id'], entry['message_id'])] = entry
+                            stats['messages_forwarded'] += 1
+                        else:
+                            stats['messages_failed'] += 1
+                    elif event == 'deleted':
+                        deletes.pop((entry['chat_id'], entry['message_id']), None)
+                        if entry.get('success'):
+                            stats['messages_deleted'] += 1
+        except Exception as e:
+            print(f"Journal load error: {e}")
+            return
+        if not session:
+            self._clear_journal()
+            return
+
+        try:
+            destination_chat = await self.bot.get_chat(session['destination'])
+        except Exception as e:
+            print(f"Journal resume error, destination unavailable: {e}")
+            return
+
+        pending_links = []
+        for link in links:
+            if links_done[link] > 0:
+                links_done[link] -= 1
+            else:
+                pending_links.append(link)
+
+        self.state['active'] = True
+        self.state['status_chat_id'] = session['status_chat_id']
+        self.state['destination_chat'] = destination_chat
+        self.state['collected_links'] = len(links)
+        self.state['total_links'] = len(links)
+        self.state['processed_links'] = len(links) - len(pending_links)
+        self.state['current_sequence'] = max((task['sequence'] for task in forwards.values()), default=-1) + 1
+        self.state['stats'].update(stats)
+        self.state['stats']['pending_forwards'] = len(forwards)
+        self.state['stats']['pending_deletions'] = len(deletes)
+
+        self._add_work(len(pending_links) + len(forwards) + len(deletes))
+        self.state['session_links'] = {self._link_key(link) for link in links}
+        self._add_links(pending_links)
+        batches = {}
+        for task in forwards.values():
+            if task.get('batch'):
+                batches.setdefault(task['batch'], []).append(task)
+        for batch_key, batch_tasks in batches.items():
+            self._register_batch(batch_key, batch_tasks[0]['chat_id'], [task['message_id'] for task in batch_tasks])
+        forward_tasks = sorted(forwards.values(), key=lambda t: t['sequence'])
+        for task in forward_tasks:
+            self.state['outstanding_sequences'].append(task['sequence'])
+        # Queued in the background, the bounded queues only drain once workers run
+        self.workers['resume_feeder'].append(
+            asyncio.create_task(self._feed_resumed_tasks(forward_tasks, list(deletes.values())))
+        )
+
+        summary = (
+            f"♻️ Resumed interrupted batch\n\n"
+            f"• Links left: {len(pending_links)}/{len(links)}\n"
+            f"• Messages to forward: {len(forwards)}\n"
+            f"• Messages to delete: {len(deletes)}"
+        )
+        if processing:
+            self.state['processing'] = True
+            if self.state['in_flight'] <= 0:
+                self.all_done.set()
+            await self._send_separate(summary)
+            await self.start_workers()
+            asyncio.create_task(self.status_reporter())
+        else:
+            await self._send_separate(summary + "\n\nSend more links or /process to start")
+
+    async def _feed_resumed_tasks(self, forward_tasks: List[Dict], delete_tasks: List[Dict]):
+        """Queue resumed forwards ahead of any new link's, then resumed deletes"""
+        async with self.enqueue_lock:
+            for task in forward_tasks:
+                await self._put(self.forward_queue, 'forward', task)
+        for task in delete_tasks:
+            await self._put(self.delete_queue, 'delete', task)
+
+    async def _put(self, queue: asyncio.Queue, name: str, item):
+        """Put into a bounded queue, adding any time spent waiting for room to the blocked stats"""
+        if not queue.full():
+            queue.put_nowait(item)
+            return
+        started = time.monotonic()
+        await queue.put(item)
+        self.state['stats']['blocked'][name] += time.monotonic() - started
+
+    def _add_links(self, links: List[str]):
+        """Add links to the backlog for the link feeder"""
+        self.link_backlog.extend(links)
+        self.link_backlog_ready.set()
+
+    async def link_feeder(self):
+        """Move backlog links into the bounded link queue as processors free up"""
+        while not self.state['cancelled'] and self.state['processing']:
+            if not self.link_backlog:
+                self.link_backlog_ready.clear()
+                await self.link_backlog_ready.wait()
+                continue
+            await self._put(self.link_queue, 'link', self.link_backlog.popleft())
+
+    def _add_work(self, count: int = 1):
+        """Count links, forwards or deletes entering the pipeline"""
+        self.state['in_flight'] += count
+
+    def _finish_work(self, count: int = 1):
+        """Count resolved work, signalling completion when nothing is left in flight"""
+        self.state['in_flight'] -= count
+        if self.state['in_flight'] <= 0 and self.state['processing']:
+            self.all_done.set()
+
+    def _queued_links(self) -> int:
+        """Links waiting in the backlog, the queue or parked behind a busy bot"""
+        return (len(self.link_backlog) + self.link_queue.qsize() +
+                sum(len(links) for links in self.active_bots.values()))
 
     async def link_processor_worker(self):
-        """Worker that processes links and finds messages to forward"""
+        """Worker that takes links and processes them, one link at a time per target bot"""
         while not self.state['cancelled'] and self.state['processing']:
+            queue = self.link_queue
+            link = await queue.get()
             try:
-                link = await self.link_queue.get()
                 if link is None:
                     break
                 
-                username = link.split('/')[3].split('?')[0]
-                start_param = link.split('start=')[1]
+                # Usernames are case-insensitive, t.me/FooBot and t.me/foobot are the same chat
+                username = link.split('/')[3].split('?')[0].lower()
+                if username in self.active_bots:
+                    # Replies go to the same chat, so the worker serving this bot runs it next
+                    self.active_bots[username].append(link)
+                    continue
+                
+                self.active_bots[username] = deque([link])
+                try:
+                    # Each link's stabilized reply ID is the baseline for the next link to the same bot
+                    baseline_msg_id = None
+                    while self.active_bots[username] and not self.state['cancelled']:
+                        baseline_msg_id = await self._process_link(
+                            self.active_bots[username].popleft(), baseline_msg_id
+                        )
+                finally:
+                    self.active_bots.pop(username, None)
+            finally:
+                queue.task_done()
 
-                # Update total links count dynamically
-                current_total = max(self.state['total_links'], self.state['processed_links'] + self.link_queue.qsize() + 1)
-                self.state['total_links'] = current_total
+    async def _process_link(self, link: str, baseline_msg_id: Optional[int] = None) -> Optional[int]:
+        """Invoke a start link and queue the bot's replies, returns the stabilized last message ID"""
+        chat_id = None
+        requeued = False
+        outcome = 'failed'
+        message_count = 0
+        try:
+            username = link.split('/')[3].split('?')[0]
+            start_param = link.split('start=')[1]
 
-                # Send link processing report
-                await self.send_status(
-                    f"🔗 Processing link {self.state['processed_links'] + 1}/{self.state['total_links']}: {link}"
-                )
-                self.state['stats']['current_link'] = username
+            # Update total links count dynamically
+            current_total = max(self.state['total_links'], self.state['processed_links'] + self._queued_links() + 1)
+            self.state['total_links'] = current_total
 
-                # Resolve chat ID
-                chat_id = await self._resolve_username(username)
-                if not chat_id:
-                    self.state['processed_links'] += 1
-                    continue
+            # Send link processing report
+            await self.send_status(
+                f"🔗 Processing link {self.state['processed_links'] + 1}/{self.state['total_links']}: {link}"
+            )
+            self.state['stats']['current_link'] = username
+
+            # Resolve chat ID
+            chat_id = await self._resolve_username(username)
+            if not chat_id:
+                self.state['processed_links'] += 1
+                return
+            chained = chat_id in self.watched_chats
+            if not chained:
+                self._watch_chat(chat_id)
+            watch = self.watched_chats[chat_id]
+            waits = self._bot_waits(username)
 
+            if (chained and baseline_msg_id is not None and
+                    watch['last_id'] <= baseline_msg_id):
+                # Previous link to this bot just stabilized and nothing arrived since
+                stabilized_msg_id = baseline_msg_id
+            else:
                 # Get initial last message ID
                 initial_msg_id = await self._get_last_message_id(chat_id)
-                if not initial_msg_id:
+                if initial_msg_id is None:
                     self.state['processed_links'] += 1
-                    continue
+                    return
 
                 # Wait for stabilization before invoking
-                stabilized_msg_id = await self._wait_for_stabilization(chat_id, initial_msg_id)
-                if not stabilized_msg_id:
+                stabilized_msg_id = await self._wait_for_stabilization(chat_id, initial_msg_id, waits['quiet_period'])
+                if stabilized_msg_id is None:
                     self.state['processed_links'] += 1
-                    continue
+                    return
 
-                # Invoke the bot
-                try:
-                    peer = await self.bot.resolve_peer(username)
-                    await self.bot.invoke(
-                        raw.functions.messages.StartBot(
-                            bot=peer,
-                            peer=peer,
-                            start_param=start_param,
-                            random_id=self.bot.rnd_id()
-                        )
+            # Invoke the bot
+            try:
+                peer = await self.bot.resolve_peer(username)
+                watch['arrivals'] = []
+                invoked_at = time.monotonic()
+                updates = await self.bot.invoke(
+                    raw.functions.messages.StartBot(
+                        bot=peer,
+                        peer=peer,
+                        start_param=start_param,
+                        random_id=self.bot.rnd_id()
                     )
-                    
-                    # Wait after invoking
-                    await asyncio.sleep(self.settings['initial_wait'])
-                    first_after_msg_id = await self._get_last_message_id(chat_id)
-                    
-                    if not first_after_msg_id:
-                        self.state['processed_links'] += 1
-                        continue
+                )
+                
+                # Wait for the bot's first reply, counted from our own /start message
+                start_msg_id = self._get_sent_message_id(updates)
+                reply_baseline_id = max(stabilized_msg_id, start_msg_id or 0)
+                watch['last_id'] = max(watch['last_id'], reply_baseline_id)
+                first_after_msg_id = await self._wait_for_reply(chat_id, reply_baseline_id, waits['reply_timeout'])
+                
+                if first_after_msg_id is None:
+                    self.state['processed_links'] += 1
+                    return
 
-                    # Wait for stabilization after invoking
-                    stabilized_after_msg_id = await self._wait_for_stabilization(chat_id, first_after_msg_id)
-                    if not stabilized_after_msg_id:
-                        self.state['processed_links'] += 1
-                        continue
+                # Wait for stabilization after invoking
+                stabilized_after_msg_id = await self._wait_for_stabilization(
+                    chat_id, first_after_msg_id, waits['quiet_period']
+                )
+                if stabilized_after_msg_id is None:
+                    self.state['processed_links'] += 1
+                    return
+                self._record_bot_timing(username, invoked_at, watch['arrivals'])
 
-                    # Collect messages between initial and final message IDs
-                    message_ids = []
-                    async for message in self.bot.get_chat_history(chat_id):
-                        if message and not message.empty and stabilized_msg_id < message.id <= stabilized_after_msg_id:
-                            message_ids.append(message.id)
-                        elif message.id <= stabilized_msg_id:
-                            break
-                    
-                    # Send link processed report
-                    await self.send_status(
-                        f"✅ Link processed for @{username}\n"
-                        f"📨 Message range: {stabilized_msg_id + 1}-{stabilized_after_msg_id}\n"
-                        f"🔢 Available messages: {len(message_ids)}"
-                    )
-                    self.state['stats']['current_link_messages'] = len(message_ids)
+                # Collect the bot's messages after our /start up to the final message ID
+                message_meta = await self._get_message_range(chat_id, reply_baseline_id, stabilized_after_msg_id)
+                message_ids = sorted(message_meta)
+                
+                # Send link processed report
+                await self.send_status(
+                    f"✅ Link processed for @{username}\n"
+                    f"📨 Message range: {reply_baseline_id + 1}-{stabilized_after_msg_id}\n"
+                    f"🔢 Available messages: {len(message_ids)}"
+                )
+                self.state['stats']['current_link_messages'] = len(message_ids)
 
-                    # Save messages to forward and delete queues
-                    if message_ids:
-                        await self._save_messages_to_forward(username, message_ids)
-                        await self._save_messages_to_delete(username, message_ids)
+                # Save messages to forward and delete queues
+                if message_ids:
+                    # Oldest first, queued contiguously so queue order matches sequence order
+                    async with self.enqueue_lock:
+                        tasks = await self._save_messages_to_forward(username, chat_id, message_ids, message_meta)
                         self.state['stats']['links_processed'] += 1
                         
-                        # Put messages in forward queue (oldest first)
-                        for msg_id in sorted(message_ids):
-                            await self.forward_queue.put({
-                                'username': username,
-                                'message_id': msg_id,
-                                'chat_id': chat_id
-                            })
+                        self._add_work(len(tasks))
+                        for task in tasks:
+                            await self._put(self.forward_queue, 'forward', task)
                             self.state['stats']['pending_forwards'] += 1
 
-                    self.state['processed_links'] += 1
-
-                except FloodWait as e:
-                    await asyncio.sleep(e.value)
-                    await self.link_queue.put(link)  # Retry same link
-                except Exception as e:
-                    await self.send_status(f"❌ Failed @{username}: {str(e)}")
-                    self.state['processed_links'] += 1
+                self.state['processed_links'] += 1
+                outcome = 'queued' if message_ids else 'empty'
+                message_count = len(message_ids)
+                return stabilized_after_msg_id
 
+            except FloodWait as e:
+                await asyncio.sleep(e.value)
+                self._add_links([link])  # Retry same link
+                requeued = True
             except Exception as e:
-                await self.send_status(f"🚨 Link processor error: {str(e)}")
+                await self.send_status(f"❌ Failed @{username}: {str(e)}")
                 self.state['processed_links'] += 1
-            finally:
-                self.link_queue.task_done()
+
+        except Exception as e:
+            await self.send_status(f"🚨 Link processor error: {str(e)}")
+            self.state['processed_links'] += 1
+        finally:
+            # Keep watching while more links for this bot are parked, so the next one can chain
+            if chat_id and not self.active_bots.get(username.lower()):
+                self._unwatch_chat(chat_id)
+            if not requeued:
+                self._journal('link_done', link=link)
+                self._remember_link(link, outcome, message_count)
+                self._finish_work()
 
     async def forwarder_worker(self):
-        """Worker that forwards messages in sequence"""
+        """Worker that fetches and prepares messages in parallel, sending them in sequence order"""
         while not self.state['cancelled'] and self.state['processing']:
+            queue = self.forward_queue
+            task = await queue.get()
             try:
-                task = await self.forward_queue.get()
                 if task is None:
                     break
-                
-                username = task['username']
-                message_id = task['message_id']
-                chat_id = task['chat_id']
-                
-                # Get the message
-                try:
-                    message = await self.bot.get_messages(chat_id, message_id)
-                    if not message or message.empty:
-                        self.state['stats']['messages_failed'] += 1
-                        self.state['stats']['pending_forwards'] -= 1
-                        continue
-                    
-                    # Forward the message
-                    try:
-                        if message.media:
-                            await message.copy(self.state['destination_chat'].id)
-                        else:
-                            await self.bot.send_message(
-                                self.state['destination_chat'].id,
-                                message.text,
-                                entities=message.entities
-                            )
-                        self.state['stats']['messages_forwarded'] += 1
-                        
-                        # Put in delete queue and increment pending deletions
-                        self.state['stats']['pending_deletions'] += 1
-                        await self.delete_queue.put({
-                            'username': username,
-                            'message_id': message_id,
-                            'chat_id': chat_id
-                        })
-                        
-                        await self.send_status(f"🗑️ Deleted message {message_id} from @{username}")
-                        
-                    except RPCError as e:
-                        if "CHAT_FORWARDS_RESTRICTED" in str(e):
-                            # Fallback to download-upload
-                            success = await self._download_and_upload(message)
-                            if success:
-                                self.state['stats']['messages_forwarded'] += 1
-                                self.state['stats']['pending_deletions'] += 1
-                                await self.delete_queue.put({
-                                    'username': username,
-                                    'message_id': message_id,
-                                    'chat_id': chat_id
-                                })
-                                await self.send_status(f"🗑️ Deleted message {message_id} from @{username}")
-                            else:
-                                self.state['stats']['messages_failed'] += 1
-                        else:
-                            self.state['stats']['messages_failed'] += 1
-                            await self.send_status(f"⚠️ Failed to forward {message_id}: {str(e)}")
-                    
-                    self.state['stats']['pending_forwards'] -= 1
-                except Exception as e:
-                    self.state['stats']['messages_failed'] += 1
-                    self.state['stats']['pending_forwards'] -= 1
-                    await self.send_status(f"⚠️ Error getting message {message_id}: {str(e)}")
-
+                await self._forward_task(task)
             except Exception as e:
                 await self.send_status(f"🚨 Forwarder worker error: {str(e)}")
             finally:
-                self.forward_queue.task_done()
+                queue.task_done()
 
-    async def deleter_worker(self):
-        """Worker that deletes forwarded messages"""
-        while not self.state['cancelled'] and self.state['processing']:
+    def _register_batch(self, batch_key: str, chat_id: int, message_ids: List[int]):
+        """Register the message IDs of one link in slices of FETCH_SLICE_SIZE, each fetched on first use"""
+        batch = {}
+        for i in range(0, len(message_ids), self.FETCH_SLICE_SIZE):
+            chunk = message_ids[i:i + self.FETCH_SLICE_SIZE]
+            fetch_slice = {'chat_id': chat_id, 'ids': chunk, 'future': None}
+            for message_id in chunk:
+                batch[message_id] = fetch_slice
+        self.message_batches[batch_key] = batch
+
+    async def _fetch_batch(self, chat_id: int, message_ids: List[int]) -> Dict[int, Message]:
+        """Fetch one slice of message bodies with a single get_messages call"""
+        while True:
             try:
-                task = await self.delete_queue.get()
+                result = await self.bot.get_messages(chat_id, message_ids)
+                break
+            except FloodWait as e:
+                await asyncio.sleep(e.value)
+        return {message.id: message for message in result if message and not message.empty}
+
+    async def _get_message(self, task: Dict) -> Optional[Message]:
+        """Get a task's message from its slice's bulk fetch, or singly when no batch is known"""
+        batch_key = task.get('batch')
+        batch = self.message_batches.get(batch_key)
+        fetch_slice = batch.pop(task['message_id'], None) if batch is not None else None
+        if batch is not None and not batch:
+            self.message_batches.pop(batch_key, None)
+        if not fetch_slice:
+            return await self.bot.get_messages(task['chat_id'], task['message_id'])
+        if fetch_slice['future'] is None:
+            fetch_slice['future'] = asyncio.ensure_future(self._fetch_batch(fetch_slice['chat_id'], fetch_slice['ids']))
+        try:
+            messages = await asyncio.shield(fetch_slice['future'])
+        except FloodWait:
+            raise
+        except RPCError:
+            return await self.bot.get_messages(task['chat_id'], task['message_id'])
+        # Each task takes its own message out, so a slice is released once all of its tasks ran
+        return messages.pop(task['message_id'], None)
+
+    async def _wait_for_turn(self, sequence: int):
+        """Wait until every earlier forward task has been sent or failed"""
+        async with self.send_turn:
+            await self.send_turn.wait_for(
+                lambda: not self.state['outstanding_sequences'] or
+                self.state['outstanding_sequences'][0] >= sequence or
+                self.state['cancelled']
+            )
+
+    async def _finish_turn(self, sequence: int):
+        """Release the send turn to the next sequence"""
+        async with self.send_turn:
+            try:
+                self.state['outstanding_sequences'].remove(sequence)
+            except ValueError:
+                pass
+            self.send_turn.notify_all()
+
+    async def _forward_task(self, task: Dict):
+        """Fetch and prepare one message, then send it once its sequence is next"""
+        username = task['username']
+        message_id = task['message_id']
+        chat_id = task['chat_id']
+        message = None
+        prepared = None
+        fetch_error = None
+
+        try:
+            # Fetch and prepare ahead of our turn
+            try:
+                message = await self._get_message(task)
+                if message and not message.empty and (task.get('noforwards') or message.has_protected_content):
+                    self.restricted_chats.add(chat_id)
+                if message and not message.empty and message.media and chat_id in self.restricted_chats:
+                    prepared = await self._prepare_upload(message)
+            except Exception as e:
+                fetch_error = e
+
+            await self._wait_for_turn(task['sequence'])
+            if self.state['cancelled']:
+                return
+
+            success = False
+            if fetch_error:
+                await self.send_status(f"⚠️ Error getting message {message_id}: {str(fetch_error)}")
+            elif message and not message.empty:
+                try:
+                    if prepared:
+                        success = await self._upload_prepared(message, prepared)
+                    elif message.media:
+                        await message.copy(self.state['destination_chat'].id)
+                        success = True
+                    else:
+                        await self.bot.send_message(
+                            self.state['destination_chat'].id,
+                            message.text,
+                            entities=message.entities
+                        )
+                        success = True
+                except RPCError as e:
+                    if "CHAT_FORWARDS_RESTRICTED" in str(e):
+                        # Fallback to download-upload, and skip the copy for this chat from now on
+                        self.restricted_chats.add(chat_id)
+                        success = await self._download_and_upload(message)
+                    else:
+                        await self.send_status(f"⚠️ Failed to forward {message_id}: {str(e)}")
+                except Exception as e:
+                    await self.send_status(f"⚠️ Failed to forward {message_id}: {str(e)}")
+
+            if success:
+                self.state['stats']['messages_forwarded'] += 1
+                await self._save_forward_result(task, True)
+                
+                # Put in delete queue and increment pending deletions
+                self.state['stats']['pending_deletions'] += 1
+                self._add_work()
+                await self._put(self.delete_queue, 'delete', {
+                    'username': username,
+                    'message_id': message_id,
+                    'chat_id': chat_id
+                })
+            else:
+                self.state['stats']['messages_failed'] += 1
+                await self._save_forward_result(task, False)
+            self.state['stats']['pending_forwards'] -= 1
+        finally:
+            self._cleanup_prepared(prepared)
+            await self._finish_turn(task['sequence'])
+            self._finish_work()
+
+    async def deleter_worker(self):
+        """Worker that deletes forwarded messages in batches per chat"""
+        pending = {}
+        flush_at = None
+        get_task = None
+        loop = asyncio.get_event_loop()
+        try:
+            while not self.state['cancelled'] and self.state['processing']:
+                if get_task is None:
+                    get_task = asyncio.ensure_future(self.delete_queue.get())
+                timeout = max(0, flush_at - loop.time()) if flush_at else None
+                done, _ = await asyncio.wait({get_task}, timeout=timeout)
+                
+                if not done:
+                    # Linger expired, flush whatever has accumulated
+                    for chat_id in list(pending):
+                        await self._delete_batch(chat_id, pending.pop(chat_id))
+                    flush_at = None
+                    continue
+                
+                task = get_task.result()
+                get_task = None
                 if task is None:
+                    self.delete_queue.task_done()
                     break
                 
-                message_id = task['message_id']
-                chat_id = task['chat_id']
-                
+                batch = pending.setdefault(task['chat_id'], [])
+                batch.append(task)
+                if flush_at is None:
+                    flush_at = loop.time() + self.settings['delete_linger']
+                if len(batch) >= self.settings['delete_batch_size']:
+                    await self._delete_batch(task['chat_id'], pending.pop(task['chat_id']))
+                    if not pending:
+                        flush_at = None
+        finally:
+            if get_task and not get_task.done():
+                get_task.cancel()
+            for chat_id in list(pending):
+                await self._delete_batch(chat_id, pending.pop(chat_id))
+
+    async def _delete_batch(self, chat_id: int, tasks: List[Dict]):
+        """Delete up to delete_batch_size messages of one chat in a single call"""
+        message_ids = [task['message_id'] for task in tasks]
+        failed = {}
+        try:
+            while True:
+                try:
+                    await self.bot.delete_messages(chat_id, message_ids)
+                    break
+                except FloodWait as e:
+                    await asyncio.sleep(e.value)
+        except Exception:
+            # Retry one by one to find out which IDs failed
+            for message_id in message_ids:
                 try:
                     await self.bot.delete_messages(chat_id, message_id)
-                    self.state['stats']['messages_deleted'] += 1
                 except Exception as e:
-                    await self.send_status(f"⚠️ Failed to delete {message_id}: {str(e)}")
-                finally:
-                    # Decrement pending deletions counter
-                    self.state['stats']['pending_deletions'] -= 1
-                    self.delete_queue.task_done()
+                    failed[message_id] = str(e)
 
-            except Exception as e:
-                await self.send_status(f"🚨 Deleter worker error: {str(e)}")
-                self.state['stats']['pending_deletions'] -= 1
-                self.delete_queue.task_done()
+        for task in tasks:
+            success = task['message_id'] not in failed
+            if success:
+                self.state['stats']['messages_deleted'] += 1
+            await self._save_delete_result(task, success)
+            # Decrement pending deletions counter
+            self.state['stats']['pending_deletions'] -= 1
+            self.delete_queue.task_done()
+            self._finish_work()
 
-    async def _download_and_upload(self, message: Message) -> bool:
-        """Download and upload media with thumbnail handling"""
-        temp_path = None
-        thumb_path = None
+        if failed:
+            details = "\n".join(f"• {message_id}: {error}" for message_id, error in failed.items())
+            await self.send_status(f"⚠️ Failed to delete {len(failed)} message(s):\n{details}")
+
+    async def _prepare_upload(self, message: Message) -> Optional[Dict]:
+        """Download media and thumbnail for re-upload"""
+        prepared = {'path': None, 'thumb': None}
         try:
             # Determine file extension
             if message.video:
@@ -421,15 +1118,29 @@ class CombinedLinkForwarder:
             elif message.document:
                 file_ext = os.path.splitext(message.document.file_name or "")[1] or ".bin"
             else:
-                return False
+                return None
 
             # Download media
-            temp_path = os.path.join(self.temp_dir, f"media_{message.id}{file_ext}")
-            temp_path = await self.bot.download_media(message, file_name=temp_path)
+            temp_path = os.path.join(self.temp_dir, f"media_{message.chat.id}_{message.id}{file_ext}")
+            prepared['path'] = await self.bot.download_media(message, file_name=temp_path)
             
-            if not temp_path or not os.path.exists(temp_path):
-                return False
+            if not prepared['path'] or not os.path.exists(prepared['path']):
+                self._cleanup_prepared(prepared)
+                return None
 
+            # Handle thumbnail
+            if message.video and message.video.thumbs:
+                prepared['thumb'] = await self.bot.download_media(message.video.thumbs[0].file_id)
+            return prepared
+
+        except Exception as e:
+            self._cleanup_prepared(prepared)
+            await self.send_status(f"⚠️ Download failed for {message.id}: {str(e)}")
+            return None
+
+    async def _upload_prepared(self, message: Message, prepared: Dict) -> bool:
+        """Upload previously downloaded media"""
+        try:
             # Prepare send arguments
             kwargs = {
                 'caption': message.caption,
@@ -444,23 +1155,19 @@ class CombinedLinkForwarder:
                     'height': message.video.height,
                     'supports_streaming': True
                 })
-                
-                # Handle thumbnail
-                if message.video.thumbs:
-                    thumb_path = await self.bot.download_media(message.video.thumbs[0].file_id)
-                    if thumb_path:
-                        kwargs['thumb'] = thumb_path
+                if prepared['thumb']:
+                    kwargs['thumb'] = prepared['thumb']
 
                 await self.bot.send_video(
                     chat_id=self.state['destination_chat'].id,
-                    video=temp_path,
+                    video=prepared['path'],
                     **kwargs
                 )
 
             elif message.photo:
                 await self.bot.send_photo(
                     chat_id=self.state['destination_chat'].id,
-                    photo=temp_path,
+                    photo=prepared['path'],
                     **kwargs
                 )
 
@@ -469,30 +1176,42 @@ class CombinedLinkForwarder:
                     kwargs['thumb'] = message.document.thumbs[0].file_id
                 await self.bot.send_document(
                     chat_id=self.state['destination_chat'].id,
-                    document=temp_path,
+                    document=prepared['path'],
                     **kwargs
                 )
 
             return True
 
         except Exception as e:
-            await self.send_status(f"⚠️ Download/upload failed for {message.id}: {str(e)}")
+            await self.send_status(f"⚠️ Upload failed for {message.id}: {str(e)}")
             return False
-        finally:
-            # Clean up temp files
-            if temp_path and os.path.exists(temp_path):
-                try:
-                    os.remove(temp_path)
-                except:
-                    pass
-            if thumb_path and os.path.exists(thumb_path):
+
+    def _cleanup_prepared(self, prepared: Optional[Dict]):
+        """Remove downloaded temp files"""
+        if not prepared:
+            return
+        for path in (prepared['path'], prepared['thumb']):
+            if path and os.path.exists(path):
                 try:
-                    os.remove(thumb_path)
+                    os.remove(path)
                 except:
                     pass
 
+    async def _download_and_upload(self, message: Message) -> bool:
+        """Download and upload media with thumbnail handling"""
+        prepared = await self._prepare_upload(message)
+        if not prepared:
+            return False
+        try:
+            return await self._upload_prepared(message, prepared)
+        finally:
+            self._cleanup_prepared(prepared)
+
     async def start_workers(self):
         """Start all worker tasks"""
+        # Start the feeder moving collected links into the link queue
+        self.workers['link_feeder'].append(asyncio.create_task(self.link_feeder()))
+        
         # Start link processor workers
         for _ in range(self.worker_config['link_processor']):
             task = asyncio.create_task(self.link_processor_worker())
@@ -510,7 +1229,8 @@ class CombinedLinkForwarder:
 
     async def stop_workers(self):
         """Stop all worker tasks gracefully"""
-        # Send sentinel values to queues
+        # Wake the link feeder so it sees processing has stopped, and send sentinel values to queues
+        self.link_backlog_ready.set()
         for _ in range(self.worker_config['link_processor']):
             await self.link_queue.put(None)
         for _ in range(self.worker_config['forwarders']):
@@ -520,6 +1240,7 @@ class CombinedLinkForwarder:
         
         # Wait for all workers to complete
         await asyncio.gather(
+            *self.workers['link_feeder'],
             *self.workers['link_processor'],
             *self.workers['forwarders'],
             *self.workers['deleter']
@@ -528,53 +1249,67 @@ class CombinedLinkForwarder:
         # Clean up temp files
         self.clean_temp_dir()
 
+    def _reset_pipeline(self):
+        """Drop queued links, forwards and deletes and the per-link bookkeeping of an earlier session"""
+        for tasks in self.workers.values():
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            tasks.clear()
+        if self.last_id_poller and not self.last_id_poller.done():
+            self.last_id_poller.cancel()
+        self.last_id_poller = None
+        self.last_id_waiters = {}
+        self.link_queue = asyncio.Queue(maxsize=self.queue_limits['link'])
+        self.forward_queue = asyncio.Queue(maxsize=self.queue_limits['forward'])
+        self.delete_queue = asyncio.Queue(maxsize=self.queue_limits['delete'])
+        self.link_backlog.clear()
+        self.link_backlog_ready.clear()
+        self.message_batches.clear()
+        self.active_bots.clear()
+        self.watched_chats.clear()
+        self.all_done.clear()
+
+    def reset_state(self):
+        """Cancel the current session, stopping workers and dropping its queued work and journal"""
+        self.state['cancelled'] = True
+        self.state['processing'] = False
+        self.state['active'] = False
+        self._reset_pipeline()
+        self.clean_temp_dir()
+        self._clear_journal()
+
     async def status_reporter(self):
-        """Periodically report status and check for completion"""
+        """Periodically report status until the pipeline signals completion"""
         while not self.state['cancelled'] and self.state['processing']:
-            # Check if all work is done (queues empty, all links processed, and no pending operations)
-            queues_empty = (self.link_queue.qsize() == 0 and 
-                          self.forward_queue.qsize() == 0 and 
-                          self.delete_queue.qsize() == 0)
-            
-            all_links_processed = (self.state['processed_links'] >= self.state['total_links'])
-            no_pending_operations = (self.state['stats']['pending_forwards'] == 0 and 
-                                    self.state['stats']['pending_deletions'] == 0)
-            
-            if queues_empty and all_links_processed and no_pending_operations:
-                # Small delay to ensure no more operations are pending
-                await asyncio.sleep(self.settings['completion_delay'])
+            if self.all_done.is_set():
+                # Calculate accurate totals
+                total_messages = (self.state['stats']['messages_forwarded'] + 
+                                self.state['stats']['messages_failed'])
+                total_links = max(self.state['total_links'], self.state['processed_links'])
                 
-                # Final verification
-                if (self.link_queue.qsize() == 0 and 
-                    self.forward_queue.qsize() == 0 and 
-                    self.delete_queue.qsize() == 0 and
-                    self.state['stats']['pending_forwards'] == 0 and
-                    self.state['stats']['pending_deletions'] == 0):
-                    
-                    # Calculate accurate totals
-                    total_messages = (self.state['stats']['messages_forwarded'] + 
-                                    self.state['stats']['messages_failed'])
-                    total_links = max(self.state['total_links'], self.state['processed_links'])
-                    
-                    # Send final report
-                    await self.send_status(
-                        f"🎉 All processing complete!\n\n"
-                        f"• Total links: {total_links}\n"
-                        f"• Processed links: {self.state['processed_links']}\n\n"
-                        f"📊 Forwarding totals:\n"
-                        f"• Total messages: {total_messages}\n"
-                        f"• ✅ Successfully forwarded: {self.state['stats']['messages_forwarded']}\n"
-                        f"• ❌ Failed: {self.state['stats']['messages_failed']}\n\n"
-                        f"🗑️ Deletion totals:\n"
-                        f"• ✅ Successfully deleted: {self.state['stats']['messages_deleted']}"
-                    )
-                    self.state['processing'] = False
-                    await self.stop_workers()
-                    break
+                # Send final report
+                self.state['status_report'] = None
+                await self._update_status_message(force=True)
+                await self._send_separate(
+                    f"🎉 All processing complete!\n\n"
+                    f"• Total links: {total_links}\n"
+                    f"• Processed links: {self.state['processed_links']}\n\n"
+                    f"📊 Forwarding totals:\n"
+                    f"• Total messages: {total_messages}\n"
+                    f"• ✅ Successfully forwarded: {self.state['stats']['messages_forwarded']}\n"
+                    f"• ❌ Failed: {self.state['stats']['messages_failed']}\n\n"
+                    f"🗑️ Deletion totals:\n"
+                    f"• ✅ Successfully deleted: {self.state['stats']['messages_deleted']}"
+                )
+                self.state['processing'] = False
+                self._clear_journal()
+                await self.stop_workers()
+                break
             
             # Calculate current totals
             current_total = max(self.state['total_links'], 
-                              self.state['processed_links'] + self.link_queue.qsize() + 1)
+                              self.state['processed_links'] + self._queued_links() + 1)
             
             stats = self.state['stats']
             report = (
@@ -586,17 +1321,29 @@ class CombinedLinkForwarder:
                 f"• Pending forwards: {stats['pending_forwards']}\n"
                 f"• Pending deletions: {stats['pending_deletions']}\n\n"
                 f"• Current link: @{stats['current_link']} ({stats['current_link_messages']} messages)\n"
-                f"• Links in queue: {self.link_queue.qsize()}\n"
-                f"• Messages to forward: {self.forward_queue.qsize()}\n"
-                f"• Messages to delete: {self.delete_queue.qsize()}"
+                f"• Active bots: {', '.join('@' + name for name in self.active_bots) or 'none'}\n"
+                f"• Links in queue: {self._queued_links()} "
+                f"({self.link_queue.qsize()}/{self.queue_limits['link']} queued)\n"
+                f"• Messages to forward: {self.forward_queue.qsize()}/{self.queue_limits['forward']}\n"
+                f"• Messages to delete: {self.delete_queue.qsize()}/{self.queue_limits['delete']}\n"
+                f"• Time blocked on full queues: "
+                f"links {stats['blocked']['link']:.0f}s, "
+                f"forwards {stats['blocked']['forward']:.0f}s, "
+                f"deletes {stats['blocked']['delete']:.0f}s"
             )
             
-            await self.send_status(report)
-            await asyncio.sleep(self.settings['progress_update_interval'])
+            self.state['status_report'] = report
+            await self._update_status_message(force=True)
+            try:
+                await asyncio.wait_for(self.all_done.wait(), self.settings['progress_update_interval'])
+            except asyncio.TimeoutError:
+                pass
 
     async def start_combined_process(self, message: Message):
         """Initialize combined process"""
         self.clean_temp_dir()
+        self._clear_journal()
+        self._reset_pipeline()
         self.state = {
             'active': True,
             'processing': False,
@@ -607,6 +1354,14 @@ class CombinedLinkForwarder:
             'total_links': 0,
             'processed_links': 0,
             'collected_links': 0,
+            'outstanding_sequences': deque(),
+            'session_links': set(),
+            'in_flight': 0,
+            'status_msg': None,
+            'status_report': None,
+            'status_events': deque(maxlen=8),
+            'last_status_edit': 0,
+            'status_flood_until': 0,
             'stats': {
                 'links_processed': 0,
                 'messages_forwarded': 0,
@@ -615,7 +1370,8 @@ class CombinedLinkForwarder:
                 'current_link': None,
                 'current_link_messages': 0,
                 'pending_deletions': 0,
-                'pending_forwards': 0
+                'pending_forwards': 0,
+                'blocked': {'link': 0.0, 'forward': 0.0, 'delete': 0.0}
             }
         }
         
@@ -632,19 +1388,19 @@ class CombinedLinkForwarder:
 
         text = message.text.strip()
         if text.lower() == '/cancel':
-            self.state['cancelled'] = True
+            self.reset_state()
             await message.reply_text("❌ Process cancelled")
-            self.state['active'] = False
             return
 
         try:
             dest_chat = await self.bot.get_chat(text)
             self.state['destination_chat'] = dest_chat
+            self._journal('session', destination=dest_chat.id, status_chat_id=self.state['status_chat_id'])
             
             await message.reply_text(
                 f"✅ Destination set: {dest_chat.title}\n\n"
                 "Now send bot links (t.me/username?start=XXX):\n"
-                "• Can be in messages or photo captions\n"
+                "• Can be in messages, photo captions or .txt/.html/.json files\n"
                 "• Send /process when ready\n"
                 "• /cancel to stop"
             )
@@ -670,15 +1426,14 @@ class CombinedLinkForwarder:
                 
                 await message.reply_text("⏳ Processing started...")
                 self.state['processing'] = True
+                self._journal('processing')
                 await self.start_workers()
                 asyncio.create_task(self.status_reporter())
                 return
             
             if text == '/cancel':
-                self.state['cancelled'] = True
+                self.reset_state()
                 await message.reply_text("❌ Process cancelled")
-                self.state['active'] = False
-                self.clean_temp_dir()
                 return
 
         # Extract links from all message sources
@@ -697,16 +1452,32 @@ class CombinedLinkForwarder:
                 if entity.type in ["text_link", "url"]:
                     url = entity.url if entity.type == "text_link" else message.caption[entity.offset:entity.offset+entity.length]
                     found_links.extend(self.extract_links(url))
+        if message.document:
+            try:
+                found_links.extend(await self.extract_document_links(message))
+            except Exception as e:
+                await message.reply_text(f"❌ Error reading document: {str(e)}")
+                return
 
         if found_links:
-            # Add links to queue and save to file
+            # Drop links already collected or processed, then journal and queue the rest in bulk
+            new_links = []
             for link in found_links:
-                await self.link_queue.put(link)
-                await self._save_link_data(link)
-                self.state['collected_links'] += 1
+                if self._is_duplicate_link(link):
+                    continue
+                self.state['session_links'].add(self._link_key(link))
+                new_links.append(link)
+            
+            await self._save_link_data(new_links)
+            self._add_work(len(new_links))
+            self._add_links(new_links)
+            self.state['collected_links'] += len(new_links)
             
+            added = len(new_links)
+            skipped = len(found_links) - added
             await message.reply_text(
-                f"➕ Added {len(found_links)} link(s)\n"
+                f"➕ Added {added} link(s)\n"
+                + (f"♻️ Skipped duplicates: {skipped}\n" if skipped else "") +
                 f"📊 Total collected: {self.state['collected_links']}\n\n"
                 "Send /process to start forwarding"
             )
@@ -3,7 +3,7 @@ import asyncio
 import tempfile
 import json
 from typing import List
-from pyrogram import Client
+from pyrogram import Client, raw
 from pyrogram.types import Message
 from pyrogram.errors import FloodWait, RPCError
 
@@ -12,8 +12,16 @@ class DeleteBot:
         self.bot = bot
         self.temp_dir = tempfile.mkdtemp(prefix="temp_delete_data_")
         os.makedirs(self.temp_dir, exist_ok=True)
+        # Message ID caches outlive a run, so the next scan only covers the new tail
+        self.cache_dir = "temp_delete_cache"
+        os.makedirs(self.cache_dir, exist_ok=True)
         self.reset_state()
 
+        # Scan configuration
+        self.SCAN_WORKERS = 5
+        self.SCAN_BATCH_SIZE = 5000
+        self.GET_HISTORY_LIMIT = 100
+
     def reset_state(self):
         """Reset all state variables and clean temp files"""
         self._clean_temp_files()
@@ -59,42 +67,130 @@ class DeleteBot:
             except Exception:
                 pass
 
-    async def _scan_and_cache_messages(self, chat_id: int):
-        """Scan chat and cache message IDs with min/max tracking"""
-        cache_file = os.path.join(self.temp_dir, f"{chat_id}_messages.json")
-        
-        # Clean existing cache file if present
+    def _get_cache_filename(self, chat_id: int):
+        """Generate message ID cache filename"""
+        return os.path.join(self.cache_dir, f"{chat_id}_messages.json")
+
+    def _load_cache(self, chat_id: int):
+        """Load cached ascending message IDs and the newest ID covered by the last scan"""
+        cache_file = self._get_cache_filename(chat_id)
         if os.path.exists(cache_file):
             try:
-                os.unlink(cache_file)
+                with open(cache_file, 'r') as f:
+                    data = json.load(f)
+                return data['message_ids'], data['scanned_max_id']
             except Exception as e:
-                print(f"Error cleaning cache: {e}")
-
-        message_ids = []
-        min_id = None
-        max_id = None
-        
-        async for message in self.bot.get_chat_history(chat_id):
-            if message and not message.empty:
-                message_ids.append(message.id)
-                if min_id is None or message.id < min_id:
-                    min_id = message.id
-                if max_id is None or message.id > max_id:
-                    max_id = message.id
+                print(f"Cache load error: {e}")
+        return [], 0
+
+    def _save_cache(self, chat_id: int, message_ids: List[int], scanned_max_id: int):
+        """Save ascending message IDs and the newest ID covered by the scan"""
+        cache_data = {
+            'message_ids': message_ids,
+            'min_id': message_ids[0] if message_ids else None,
+            'max_id': message_ids[-1] if message_ids else None,
+            'scanned_max_id': scanned_max_id
+        }
+        try:
+            with open(self._get_cache_filename(chat_id), 'w') as f:
+                json.dump(cache_data, f)
+        except Exception as e:
+            print(f"Cache save error: {e}")
 
+    def _remove_from_cache(self, chat_id: int, deleted_ids: List[int]):
+        """Drop deleted messages from the cache"""
+        message_ids, scanned_max_id = self._load_cache(chat_id)
         if message_ids:
-            self.state['min_id'] = min_id
-            self.state['max_id'] = max_id
-            cache_data = {
-                'message_ids': message_ids,
-                'min_id': min_id,
-                'max_id': max_id
-            }
+            deleted = set(deleted_ids)
+            self._save_cache(chat_id, [mid for mid in message_ids if mid not in deleted], scanned_max_id)
+
+    async def _get_newest_message_id(self, peer) -> int:
+        """Get the newest message ID in chat, 0 for an empty chat"""
+        result = await self.bot.invoke(
+            raw.functions.messages.GetHistory(
+                peer=peer, offset_id=0, offset_date=0, add_offset=0,
+                limit=1, max_id=0, min_id=0, hash=0
+            )
+        )
+        return max((msg.id for msg in result.messages), default=0)
+
+    async def _scan_range(self, peer, start_id: int, end_id: int) -> List[int]:
+        """Collect message IDs in start_id..end_id with raw GetHistory, newest first"""
+        ids = []
+        current_max = end_id
+        retry_count = 0
+        while current_max >= start_id and not self.state['cancelled']:
             try:
-                with open(cache_file, 'w') as f:
-                    json.dump(cache_data, f)
-            except Exception as e:
-                print(f"Cache save error: {e}")
+                result = await self.bot.invoke(
+                    raw.functions.messages.GetHistory(
+                        peer=peer,
+                        offset_id=current_max + 1,
+                        offset_date=0,
+                        add_offset=0,
+                        limit=self.GET_HISTORY_LIMIT,
+                        max_id=0,
+                        min_id=start_id - 1,
+                        hash=0
+                    ),
+                    sleep_threshold=10
+                )
+            except FloodWait as e:
+                await asyncio.sleep(e.value)
+                continue
+            except Exception:
+                retry_count += 1
+                if retry_count > 3:
+                    raise
+                await asyncio.sleep(1)
+                continue
+
+            if not result.messages:
+                break
+            ids.extend(msg.id for msg in result.messages if not isinstance(msg, raw.types.MessageEmpty))
+            current_max = min(msg.id for msg in result.messages) - 1
+            retry_count = 0
+        return ids
+
+    async def _scan_worker(self, peer, ranges: asyncio.Queue, results: List[List[int]]):
+        """Worker scanning queued ID ranges"""
+        while not ranges.empty():
+            start_id, end_id = ranges.get_nowait()
+            results.append(await self._scan_range(peer, start_id, end_id))
+
+    async def _scan_and_cache_messages(self, chat_id: int):
+        """Scan chat and cache message IDs, only scanning messages newer than the cache"""
+        peer = await self.bot.resolve_peer(chat_id)
+        cached_ids, scanned_max_id = self._load_cache(chat_id)
+        newest_id = await self._get_newest_message_id(peer)
+
+        message_ids = cached_ids
+        if newest_id > scanned_max_id:
+            # Split the new tail into ranges scanned concurrently
+            ranges = asyncio.Queue()
+            for start_id in range(scanned_max_id + 1, newest_id + 1, self.SCAN_BATCH_SIZE):
+                ranges.put_nowait((start_id, min(start_id + self.SCAN_BATCH_SIZE - 1, newest_id)))
+            results = []
+            workers = [
+                asyncio.create_task(self._scan_worker(peer, ranges, results))
+                for _ in range(min(self.SCAN_WORKERS, ranges.qsize()))
+            ]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                # Stop the other workers if one failed, gather leaves them running
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+            if self.state['cancelled']:
+                return []
+
+            new_ids = sorted(msg_id for ids in results for msg_id in ids)
+            message_ids = cached_ids + new_ids
+            self._save_cache(chat_id, message_ids, newest_id)
+
+        if message_ids:
+            self.state['min_id'] = message_ids[0]
+            self.state['max_id'] = message_ids[-1]
 
         return message_ids
 
@@ -214,6 +310,7 @@ class DeleteBot:
                     self.state['failed_ids'].extend(batch)
                     await self._send_status(f"⚠️ Failed to delete batch: {str(e)}")
 
+            self._remove_from_cache(target.id, self.state['deleted_ids'])
             await self._send_completion_report(message)
         finally:
             self._clean_temp_files()
@@ -3,22 +3,123 @@ import asyncio
 import json
 import time
 import shutil
+import heapq
+import hashlib
+import base64
+from array import array
+from bisect import bisect_left
+from operator import itemgetter
 from typing import List, Dict, Tuple
 from pyrogram import Client, raw
 from pyrogram.types import Message
 from pyrogram.errors import FloodWait, RPCError
+from pyrogram.file_id import FileUniqueId, FileUniqueType
+
+class MessageMeta:
+    """Scan metadata of many messages in ID-sorted parallel arrays, about 40 bytes per message"""
+    TYPES = ('text', 'photo', 'video', 'video_note', 'voice', 'audio', 'sticker',
+             'animation', 'document', 'other', 'service', 'empty')
+    CAPTION = 1
+    NOFORWARDS = 2
+    FIELDS = (('ids', 'q'), ('types', 'b'), ('flags', 'b'), ('sizes', 'q'),
+              ('grouped_ids', 'q'), ('dates', 'q'), ('fps', 'q'))
+
+    def __init__(self):
+        for name, typecode in self.FIELDS:
+            setattr(self, name, array(typecode))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _append(self, msg_id: int, record: tuple):
+        """Append one (type, flags, size, grouped_id, date, fp) record, IDs must arrive ascending"""
+        self.ids.append(msg_id)
+        for (name, _), value in zip(self.FIELDS[1:], record):
+            getattr(self, name).append(value)
+
+    def _record(self, index: int) -> tuple:
+        return tuple(getattr(self, name)[index] for name, _ in self.FIELDS[1:])
+
+    @classmethod
+    def build(cls, records: List[tuple]) -> 'MessageMeta':
+        """Build from (msg_id, record) pairs in any order"""
+        meta = cls()
+        for msg_id, record in sorted(records, key=itemgetter(0)):
+            meta._append(msg_id, record)
+        return meta
+
+    @classmethod
+    def merge(cls, parts: List['MessageMeta']) -> 'MessageMeta':
+        """Merge parts into one, later parts winning where ID ranges overlap"""
+        parts = [part for part in parts if len(part)]
+        ordered = sorted(parts, key=lambda part: part.ids[0])
+        merged = cls()
+        if all(ordered[i].ids[-1] < ordered[i + 1].ids[0] for i in range(len(ordered) - 1)):
+            # Scan chunks cover separate ID ranges, so appending in order is enough
+            for part in ordered:
+                for name, _ in cls.FIELDS:
+                    getattr(merged, name).extend(getattr(part, name))
+            return merged
+        records = {}
+        for part in parts:
+            for i in range(len(part)):
+                records[part.ids[i]] = part._record(i)
+        for msg_id in sorted(records):
+            merged._append(msg_id, records[msg_id])
+        return merged
+
+    def get(self, msg_id: int):
+        """Metadata dict of one message, None if not scanned"""
+        i = bisect_left(self.ids, msg_id)
+        if i == len(self.ids) or self.ids[i] != msg_id:
+            return None
+        flags = self.flags[i]
+        return {
+            'type': self.TYPES[self.types[i]],
+            'size': self.sizes[i],
+            'grouped_id': self.grouped_ids[i] or None,
+            'caption': bool(flags & self.CAPTION),
+            'noforwards': bool(flags & self.NOFORWARDS),
+            'date': self.dates[i],
+            'fp': self.fps[i] or None
+        }
+
+    def remove(self, msg_ids: set) -> 'MessageMeta':
+        """Copy without the given message IDs"""
+        kept = MessageMeta()
+        for i in range(len(self.ids)):
+            if self.ids[i] not in msg_ids:
+                kept._append(self.ids[i], self._record(i))
+        return kept
+
+    def to_json(self) -> dict:
+        """Base64 of each packed array"""
+        return {name: base64.b64encode(getattr(self, name).tobytes()).decode('ascii') for name, _ in self.FIELDS}
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'MessageMeta':
+        """Load packed arrays, empty for missing or old per-message dict data"""
+        meta = cls()
+        if not isinstance(data, dict) or 'ids' not in data:
+            return meta
+        for name, _ in cls.FIELDS:
+            getattr(meta, name).frombytes(base64.b64decode(data[name]))
+        return meta
+
 
 class ForwardBot:
-    def __init__(self, bot: Client):
+    def __init__(self, bot: Client, media_dir_name: str = "media_temp"):
         self.bot = bot
         self.base_temp_dir = "forward_temp"
-        self.media_temp_dir = os.path.join(self.base_temp_dir, "media_temp")
+        self.media_temp_dir = os.path.join(self.base_temp_dir, media_dir_name)
         self.message_temp_dir = os.path.join(self.base_temp_dir, "message_temp")
         
         os.makedirs(self.media_temp_dir, exist_ok=True)
         os.makedirs(self.message_temp_dir, exist_ok=True)
         
         self._clear_media_temp()
+        # Source chats known to refuse copies, their media goes straight to download/upload
+        self.restricted_chats = set()
         self.reset_state()
         
         # Configuration
@@ -28,6 +129,13 @@ class ForwardBot:
         self.FORWARD_DELAY = 5
         self.PROGRESS_UPDATE_INTERVAL = 2
         self.GET_HISTORY_LIMIT = 1000
+        # Forward on raw TL objects without building pyrogram Message objects,
+        # falling back to the regular path for anything it can't resend
+        self.RAW_FAST_PATH = False
+        # Planner estimates used until a destination has throughput history
+        self.DEFAULT_TRANSFER_RATE = 1024 * 1024  # bytes/s for download/upload fallback
+        self.DEFAULT_SEND_OVERHEAD = 1  # seconds per message on top of FORWARD_DELAY
+        self.THROUGHPUT_HISTORY = 10
 
     def _clear_media_temp(self):
         """Clear all files in media_temp directory"""
@@ -65,13 +173,23 @@ class ForwardBot:
             'is_running': False,
             'scan_workers': [],
             'scan_queue': asyncio.Queue(),
-            'scan_results': [],
+            'scan_results': [],  # Per-chunk ID lists, each sorted descending
+            'message_meta': MessageMeta(),
+            'meta_parts': [],  # Per-chunk MessageMeta, merged once the scan is done
+            'checkpoint_file': None,
             'scan_progress': {'scanned': 0, 'total': 0},
             'scan_lock': asyncio.Lock(),
+            'scan_incomplete': False,  # A chunk gave up, its range is left for the next scan
             'worker_status': {},
             'last_progress_text': None,
             'last_progress_time': 0,
-            'resume_scan': False
+            'resume_scan': False,
+            'id_map': {},
+            'id_map_pending': [],  # (source ID, destination ID or None when removed) not yet appended
+            'already_forwarded': 0,
+            'dedup': False,
+            'dest_index': set(),
+            'duplicate_count': 0
         }
 
     def _get_cache_filename(self, chat_id: int, username: str = None):
@@ -87,20 +205,24 @@ class ForwardBot:
             try:
                 with open(cache_file, 'r') as f:
                     data = json.load(f)
-                    if isinstance(data, dict):
-                        return data.get('message_ids', []), data.get('min_id'), data.get('max_id')
+                    # Caches from before packed metadata have no per-message records, rescan those chats
+                    if isinstance(data, dict) and isinstance(data.get('meta'), dict) and 'ids' in data['meta']:
+                        meta = MessageMeta.from_json(data['meta'])
+                        return data.get('message_ids', []), data.get('min_id'), data.get('max_id'), meta
             except Exception as e:
                 print(f"Cache load error: {e}")
-        return [], None, None
+        return [], None, None, MessageMeta()
 
     async def _save_cached_messages(self, chat_id: int, message_ids: List[int], 
-                                  min_id: int, max_id: int, username: str = None):
-        """Save messages to cache file in message_temp"""
+                                  min_id: int, max_id: int, username: str = None,
+                                  meta: MessageMeta = None):
+        """Save messages and their metadata records to cache file in message_temp"""
         cache_file = self._get_cache_filename(chat_id, username)
         data = {
-            'message_ids': message_ids,
+            'message_ids': message_ids.tolist() if isinstance(message_ids, array) else message_ids,
             'min_id': min_id,
             'max_id': max_id,
+            'meta': (meta or MessageMeta()).to_json(),
             'timestamp': time.time()
         }
         try:
@@ -109,34 +231,6 @@ class ForwardBot:
         except Exception as e:
             print(f"Cache save error: {e}")
 
-    async def _update_cached_messages(self, chat_id: int, new_ids: List[int], 
-                                    new_min_id: int, new_max_id: int, username: str = None):
-        """Update existing cache with new messages"""
-        cache_file = self._get_cache_filename(chat_id, username)
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r') as f:
-                    data = json.load(f)
-                
-                existing_ids = set(data.get('message_ids', []))
-                updated_ids = sorted(list(existing_ids.union(set(new_ids))))
-                
-                data.update({
-                    'message_ids': updated_ids,
-                    'min_id': min(data.get('min_id', new_min_id), new_min_id),
-                    'max_id': max(data.get('max_id', new_max_id), new_max_id),
-                    'timestamp': time.time()
-                })
-                
-                with open(cache_file, 'w') as f:
-                    json.dump(data, f)
-                
-                return updated_ids, data['min_id'], data['max_id']
-            except Exception as e:
-                print(f"Cache update error: {e}")
-        
-        return new_ids, new_min_id, new_max_id
-
     async def _remove_deleted_from_cache(self, chat_id: int, deleted_ids: List[int], username: str = None):
         """Remove deleted message IDs from cache"""
         cache_file = self._get_cache_filename(chat_id, username)
@@ -145,10 +239,12 @@ class ForwardBot:
                 with open(cache_file, 'r') as f:
                     data = json.load(f)
                 
+                deleted_set = set(deleted_ids)
                 remaining_ids = [msg_id for msg_id in data.get('message_ids', []) 
-                               if msg_id not in deleted_ids]
+                               if msg_id not in deleted_set]
                 
                 data['message_ids'] = remaining_ids
+                data['meta'] = MessageMeta.from_json(data.get('meta')).remove(deleted_set).to_json()
                 
                 with open(cache_file, 'w') as f:
                     json.dump(data, f)
@@ -158,12 +254,467 @@ class ForwardBot:
                 print(f"Cache update error: {e}")
         return []
 
+    def _get_checkpoint_filename(self, chat_id: int, username: str = None):
+        """Generate scan checkpoint filename in message_temp directory"""
+        return self._get_cache_filename(chat_id, username).replace("_messages.json", "_scan_checkpoint.jsonl")
+
+    def _load_scan_checkpoint(self, checkpoint_file: str, scan_min: int):
+        """Load finished ranges, IDs and per-chunk metadata of an interrupted scan starting at scan_min"""
+        done_ranges = []
+        id_chunks = []
+        meta_parts = []
+        if not os.path.exists(checkpoint_file):
+            return done_ranges, id_chunks, meta_parts
+        try:
+            with open(checkpoint_file, 'r') as f:
+                header = json.loads(f.readline() or '{}')
+                if header.get('scan_min') != scan_min:
+                    # Cache has moved on since this checkpoint was written
+                    raise ValueError("stale checkpoint")
+                for line in f:
+                    try:
+                        chunk = json.loads(line)
+                    except ValueError:
+                        break  # Partially written last line
+                    done_ranges.append(tuple(chunk['range']))
+                    id_chunks.append(chunk['ids'])
+                    meta_parts.append(MessageMeta.from_json(chunk.get('meta')))
+        except Exception as e:
+            print(f"Discarding scan checkpoint: {e}")
+            self._clear_scan_checkpoint(checkpoint_file)
+            return [], [], []
+        return done_ranges, id_chunks, meta_parts
+
+    def _start_scan_checkpoint(self, checkpoint_file: str, scan_min: int):
+        """Create checkpoint file with its header if not already present"""
+        self.state['checkpoint_file'] = checkpoint_file
+        if os.path.exists(checkpoint_file):
+            return
+        try:
+            with open(checkpoint_file, 'w') as f:
+                f.write(json.dumps({'scan_min': scan_min, 'timestamp': time.time()}) + "\n")
+        except Exception as e:
+            print(f"Checkpoint create error: {e}")
+            self.state['checkpoint_file'] = None
+
+    def _append_scan_checkpoint(self, start_id: int, end_id: int, message_ids: List[int], meta: MessageMeta):
+        """Record a finished scan chunk"""
+        checkpoint_file = self.state['checkpoint_file']
+        if not checkpoint_file:
+            return
+        chunk = {
+            'range': [start_id, end_id],
+            'ids': message_ids,
+            'meta': meta.to_json()
+        }
+        try:
+            with open(checkpoint_file, 'a') as f:
+                f.write(json.dumps(chunk) + "\n")
+        except Exception as e:
+            print(f"Checkpoint write error: {e}")
+
+    def _clear_scan_checkpoint(self, checkpoint_file: str):
+        """Remove checkpoint once its results are merged into the cache"""
+        try:
+            if os.path.exists(checkpoint_file):
+                os.remove(checkpoint_file)
+        except Exception as e:
+            print(f"Checkpoint remove error: {e}")
+
+    @staticmethod
+    def _missing_ranges(scan_min: int, scan_max: int, done_ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Return the parts of scan_min..scan_max not covered by done_ranges, newest first"""
+        missing = []
+        current_max = scan_max
+        for start_id, end_id in sorted(done_ranges, key=lambda r: r[1], reverse=True):
+            if end_id < scan_min or start_id > current_max:
+                continue
+            if end_id < current_max:
+                missing.append((end_id + 1, current_max))
+            current_max = min(current_max, start_id - 1)
+            if current_max < scan_min:
+                break
+        if current_max >= scan_min:
+            missing.append((scan_min, current_max))
+        return missing
+
+    @staticmethod
+    def _merge_sorted_ids(cached_ids: List[int], id_chunks: List[List[int]]) -> array:
+        """Merge ascending cached IDs and descending scan chunks into one deduplicated compact array"""
+        chunks = sorted((chunk for chunk in id_chunks if chunk), key=lambda chunk: chunk[-1])
+        runs_disjoint = all(
+            chunks[i][0] < chunks[i + 1][-1] for i in range(len(chunks) - 1)
+        ) and (not cached_ids or not chunks or cached_ids[-1] < chunks[0][-1])
+
+        if runs_disjoint:
+            # Scan chunks cover separate ID ranges above the cache, so appending in order is enough
+            merged = array('q', cached_ids)
+            for chunk in chunks:
+                merged.extend(reversed(chunk))
+            return merged
+
+        merged = array('q')
+        last_id = None
+        for msg_id in heapq.merge(cached_ids, *(reversed(chunk) for chunk in chunks)):
+            if msg_id != last_id:
+                merged.append(msg_id)
+                last_id = msg_id
+        return merged
+
+    def _get_throughput_filename(self, dest_chat_id: int):
+        """Generate destination throughput history filename in message_temp directory"""
+        return os.path.join(self.message_temp_dir, f"dest_{dest_chat_id}_throughput.json")
+
+    def _load_throughput(self, dest_chat_id: int) -> List[dict]:
+        """Load measured throughput of past jobs to a destination"""
+        history_file = self._get_throughput_filename(dest_chat_id)
+        if os.path.exists(history_file):
+            try:
+                with open(history_file, 'r') as f:
+                    return json.load(f).get('jobs', [])
+            except Exception as e:
+                print(f"Throughput history load error: {e}")
+        return []
+
+    def _record_throughput(self, dest_chat_id: int, messages: int, seconds: float):
+        """Append a finished job's throughput to the destination history"""
+        if messages <= 0:
+            return
+        jobs = self._load_throughput(dest_chat_id)
+        jobs.append({'messages': messages, 'seconds': seconds, 'parallel': self.MAX_PARALLEL})
+        try:
+            with open(self._get_throughput_filename(dest_chat_id), 'w') as f:
+                json.dump({'jobs': jobs[-self.THROUGHPUT_HISTORY:], 'timestamp': time.time()}, f)
+        except Exception as e:
+            print(f"Throughput history save error: {e}")
+
+    def _build_plan(self) -> str:
+        """Summarize selected messages by class with an ETA, without sending anything"""
+        target = self.state['target_chat']
+        dest = self.state['destination_chat']
+        protected = bool(getattr(target, 'has_protected_content', False))
+        id_map = self._load_id_map(target.id, dest.id)
+
+        class_counts = {}
+        albums = set()
+        to_send = 0
+        already = 0
+        fallback_bytes = 0
+        total_bytes = 0
+        for msg_id in self.state['message_ids']:
+            if msg_id in id_map:
+                already += 1
+                continue
+            meta = self.state['message_meta'].get(msg_id)
+            msg_type = meta.get('type', 'unknown') if meta else 'unknown'
+            class_counts[msg_type] = class_counts.get(msg_type, 0) + 1
+            if msg_type in ('service', 'empty'):
+                continue
+            to_send += 1
+            if meta and meta.get('grouped_id'):
+                albums.add(meta['grouped_id'])
+            size = meta.get('size', 0) if meta else 0
+            total_bytes += size
+            if protected or (meta and meta.get('noforwards')):
+                fallback_bytes += size
+
+        # Seconds per message, from past jobs to this destination when available
+        jobs = self._load_throughput(dest.id)
+        if jobs:
+            # Measured time already includes download/upload of past jobs
+            seconds_per_message = (sum(job['seconds'] * job.get('parallel', 1) for job in jobs) /
+                                   sum(job['messages'] for job in jobs))
+            rate_source = f"measured over {len(jobs)} past job(s)"
+            eta = to_send * seconds_per_message / self.MAX_PARALLEL
+        else:
+            seconds_per_message = self.FORWARD_DELAY + self.DEFAULT_SEND_OVERHEAD
+            rate_source = "estimated from delay settings"
+            eta = to_send * seconds_per_message / self.MAX_PARALLEL + fallback_bytes / self.DEFAULT_TRANSFER_RATE
+
+        classes = "\n".join(
+            f"• {msg_type}: {count}" for msg_type, count in sorted(class_counts.items(), key=lambda i: -i[1])
+        )
+        plan = (
+            f"🧭 <b>Forward Plan</b>\n\n"
+            f"{classes}\n\n"
+            f"• To send: {to_send} ({len(albums)} albums)\n"
+            f"• Already forwarded: {already}\n"
+            f"• Media size: {total_bytes / (1024 * 1024):.1f} MB\n"
+            f"• Download/upload fallback: {fallback_bytes / (1024 * 1024):.1f} MB"
+            f"{' (protected source)' if protected else ''}\n\n"
+            f"⏱️ ETA: {self._format_duration(eta)} at {seconds_per_message:.1f}s/message "
+            f"with {self.MAX_PARALLEL} worker(s), {rate_source}"
+        )
+        return plan
+
+    @staticmethod
+    def _format_duration(seconds: float) -> str:
+        """Format seconds as a short human readable duration"""
+        seconds = int(seconds)
+        days, seconds = divmod(seconds, 86400)
+        hours, seconds = divmod(seconds, 3600)
+        minutes, seconds = divmod(seconds, 60)
+        if days:
+            return f"{days}d {hours}h"
+        if hours:
+            return f"{hours}h {minutes}m"
+        return f"{minutes}m {seconds}s"
+
+    def _get_dest_index_filename(self, dest_chat_id: int):
+        """Generate destination fingerprint index filename in message_temp directory"""
+        return os.path.join(self.message_temp_dir, f"dest_{dest_chat_id}_fingerprints.json")
+
+    async def _build_dest_index(self, dest_chat) -> set:
+        """Load the destination fingerprint index and extend it with messages newer than its last scan"""
+        index_file = self._get_dest_index_filename(dest_chat.id)
+        fingerprints = set()
+        indexed_max_id = 0
+        if os.path.exists(index_file):
+            try:
+                with open(index_file, 'r') as f:
+                    data = json.load(f)
+                fingerprints = set(data.get('fingerprints', []))
+                indexed_max_id = data.get('max_id', 0)
+                if any(not isinstance(fingerprint, int) for fingerprint in fingerprints):
+                    # Index from before fingerprints were hashed to integers, rebuild it
+                    fingerprints = set()
+                    indexed_max_id = 0
+            except Exception as e:
+                print(f"Destination index load error: {e}")
+
+        peer = await self.bot.resolve_peer(dest_chat.id)
+        current_max = 0
+        newest_id = indexed_max_id
+        retry_count = 0
+        while not self.state['cancelled']:
+            try:
+                result = await self.bot.invoke(
+                    raw.functions.messages.GetHistory(
+                        peer=peer,
+                        offset_id=current_max,
+                        offset_date=0,
+                        add_offset=0,
+                        limit=self.GET_HISTORY_LIMIT,
+                        max_id=0,
+                        min_id=indexed_max_id,
+                        hash=0
+                    ),
+                    sleep_threshold=10
+                )
+                if not getattr(result, 'messages', None):
+                    break
+                for msg in result.messages:
+                    fingerprint = self._raw_fingerprint(msg)
+                    if fingerprint:
+                        fingerprints.add(fingerprint)
+                newest_id = max(newest_id, max(msg.id for msg in result.messages))
+                current_max = min(msg.id for msg in result.messages)
+                retry_count = 0
+            except FloodWait as e:
+                await asyncio.sleep(e.value)
+            except Exception as e:
+                retry_count += 1
+                if retry_count > 3:
+                    # Don't record progress past a gap, the next run rescans it
+                    print(f"Destination index scan failed: {e}")
+                    newest_id = indexed_max_id
+                    break
+                await asyncio.sleep(1)
+
+        if newest_id > indexed_max_id:
+            try:
+                with open(index_file, 'w') as f:
+                    json.dump({
+                        'fingerprints': list(fingerprints),
+                        'max_id': newest_id,
+                        'timestamp': time.time()
+                    }, f)
+            except Exception as e:
+                print(f"Destination index save error: {e}")
+        return fingerprints
+
+    def _is_duplicate(self, message_id: int, fingerprint) -> bool:
+        """Mark message skipped if its content already exists in the destination"""
+        if not self.state['dedup'] or not fingerprint or fingerprint not in self.state['dest_index']:
+            return False
+        self.state['message_status'][message_id] = {'status': 'skipped', 'progress': 0}
+        self.state['duplicate_count'] += 1
+        return True
+
+    def _get_id_map_filename(self, source_chat_id: int, dest_chat_id: int):
+        """Generate source->destination ID map filename in message_temp directory"""
+        return os.path.join(self.message_temp_dir, f"{source_chat_id}_to_{dest_chat_id}_idmap.jsonl")
+
+    def _load_id_map(self, source_chat_id: int, dest_chat_id: int) -> Dict[int, int]:
+        """Replay the append-only ID map, compacting it when it holds overwritten or removed entries"""
+        map_file = self._get_id_map_filename(source_chat_id, dest_chat_id)
+        id_map = {}
+        legacy_file = map_file[:-len(".jsonl")] + ".json"
+        if not os.path.exists(map_file) and os.path.exists(legacy_file):
+            # Map saved as one JSON object by earlier versions
+            try:
+                with open(legacy_file, 'r') as f:
+                    legacy_map = json.load(f).get('id_map', {})
+                with open(map_file, 'w') as f:
+                    f.writelines(json.dumps([int(src_id), dest_id]) + "\n" for src_id, dest_id in legacy_map.items())
+                os.remove(legacy_file)
+            except Exception as e:
+                print(f"ID map migration error: {e}")
+        if not os.path.exists(map_file):
+            return id_map
+        records = 0
+        try:
+            with open(map_file, 'r') as f:
+                for line in f:
+                    try:
+                        src_id, dest_id = json.loads(line)
+                    except ValueError:
+                        continue  # Partially written last line
+                    records += 1
+                    if dest_id is None:
+                        id_map.pop(src_id, None)
+                    else:
+                        id_map[src_id] = dest_id
+            if records > len(id_map):
+                with open(map_file + ".tmp", 'w') as f:
+                    f.writelines(json.dumps([src_id, dest_id]) + "\n" for src_id, dest_id in id_map.items())
+                os.replace(map_file + ".tmp", map_file)
+        except Exception as e:
+            print(f"ID map load error: {e}")
+        return id_map
+
+    def _save_id_map(self):
+        """Append mapping changes since the last save, /forward and /mirror may append to the same file"""
+        target = self.state['target_chat']
+        dest = self.state['destination_chat']
+        if not self.state['id_map_pending'] or not target or not dest:
+            return
+        try:
+            with open(self._get_id_map_filename(target.id, dest.id), 'a') as f:
+                f.writelines(json.dumps([src_id, dest_id]) + "\n" for src_id, dest_id in self.state['id_map_pending'])
+            self.state['id_map_pending'] = []
+        except Exception as e:
+            print(f"ID map save error: {e}")
+
+    def _map_sent(self, source_id: int, sent_id: int):
+        """Map a source message to its destination copy"""
+        self.state['id_map'][source_id] = sent_id
+        self.state['id_map_pending'].append((source_id, sent_id))
+
+    def _forget_sent(self, source_ids: List[int]) -> List[int]:
+        """Drop mappings of deleted source messages, returns their destination IDs"""
+        dest_ids = []
+        for src_id in source_ids:
+            if src_id in self.state['id_map']:
+                dest_ids.append(self.state['id_map'].pop(src_id))
+                self.state['id_map_pending'].append((src_id, None))
+        return dest_ids
+
+    def _record_sent(self, source_id: int, sent) -> bool:
+        """Record destination ID of a sent message, returns whether it was sent"""
+        if not sent:
+            return False
+        sent_id = getattr(sent, 'id', None)
+        if sent_id:
+            self._map_sent(source_id, sent_id)
+        return True
+
+    def _map_reply_to(self, message: Message):
+        """Translate source reply_to_message_id into the destination chat"""
+        if not message.reply_to_message_id:
+            return None
+        return self.state['id_map'].get(message.reply_to_message_id)
+
+    @staticmethod
+    def _fingerprint(text: str, file_unique_id: str):
+        """Content fingerprint, a signed 64-bit hash of text/caption plus media file_unique_id"""
+        if not text and not file_unique_id:
+            return None
+        digest = hashlib.sha1(f"{file_unique_id or ''}:{text or ''}".encode()).digest()
+        return int.from_bytes(digest[:8], 'big', signed=True) or 1
+
+    @classmethod
+    def _raw_fingerprint(cls, msg):
+        """Fingerprint a raw TL message, matching _message_fingerprint for the same content"""
+        if not isinstance(msg, raw.types.Message):
+            return None
+        media_id = None
+        if isinstance(msg.media, raw.types.MessageMediaPhoto) and isinstance(msg.media.photo, raw.types.Photo):
+            media_id = msg.media.photo.id
+        elif isinstance(msg.media, raw.types.MessageMediaDocument) and isinstance(msg.media.document, raw.types.Document):
+            media_id = msg.media.document.id
+        # pyrogram derives file_unique_id of photos and documents alike from the media ID
+        file_unique_id = FileUniqueId(
+            file_unique_type=FileUniqueType.DOCUMENT,
+            media_id=media_id
+        ).encode() if media_id else None
+        return cls._fingerprint(msg.message, file_unique_id)
+
+    @classmethod
+    def _message_fingerprint(cls, message: Message):
+        """Fingerprint a pyrogram Message"""
+        media = getattr(message, message.media.value, None) if message.media else None
+        return cls._fingerprint(message.text or message.caption, getattr(media, 'file_unique_id', None))
+
+    @staticmethod
+    def _build_message_meta(msg) -> tuple:
+        """Build a MessageMeta (type, flags, size, grouped_id, date, fp) record from a raw TL message"""
+        if isinstance(msg, raw.types.MessageEmpty):
+            return (MessageMeta.TYPES.index('empty'), 0, 0, 0, 0, 0)
+        if isinstance(msg, raw.types.MessageService):
+            return (MessageMeta.TYPES.index('service'), 0, 0, 0, msg.date, 0)
+
+        media = msg.media
+        media_type = 'text'
+        size = 0
+        if isinstance(media, raw.types.MessageMediaPhoto):
+            media_type = 'photo'
+            photo = media.photo
+            for photo_size in getattr(photo, 'sizes', None) or []:
+                if isinstance(photo_size, raw.types.PhotoSizeProgressive):
+                    size = max(size, max(photo_size.sizes))
+                else:
+                    size = max(size, getattr(photo_size, 'size', 0) or 0)
+        elif isinstance(media, raw.types.MessageMediaDocument):
+            media_type = 'document'
+            document = media.document
+            size = getattr(document, 'size', 0) or 0
+            for attribute in getattr(document, 'attributes', None) or []:
+                if isinstance(attribute, raw.types.DocumentAttributeVideo):
+                    media_type = 'video_note' if attribute.round_message else 'video'
+                elif isinstance(attribute, raw.types.DocumentAttributeAudio):
+                    media_type = 'voice' if attribute.voice else 'audio'
+                elif isinstance(attribute, raw.types.DocumentAttributeSticker):
+                    media_type = 'sticker'
+                    break
+                elif isinstance(attribute, raw.types.DocumentAttributeAnimated):
+                    media_type = 'animation'
+                    break
+        elif media is not None and not isinstance(media, (raw.types.MessageMediaEmpty,
+                                                        raw.types.MessageMediaWebPage)):
+            media_type = 'other'
+
+        flags = 0
+        if msg.message and media_type != 'text':
+            flags |= MessageMeta.CAPTION
+        if msg.noforwards:
+            flags |= MessageMeta.NOFORWARDS
+        return (
+            MessageMeta.TYPES.index(media_type),
+            flags,
+            size,
+            msg.grouped_id or 0,
+            msg.date,
+            ForwardBot._raw_fingerprint(msg) or 0
+        )
+
     async def _get_newest_message_id(self, chat_id: int) -> int:
-        """Get the newest message ID from chat"""
+        """Get the newest message ID from chat, 0 for an empty chat and None on error"""
         try:
             async for msg in self.bot.get_chat_history(chat_id, limit=1):
                 if msg and not msg.empty:
                     return msg.id
+            return 0
         except Exception as e:
             print(f"Error getting newest message: {e}")
         return None
@@ -184,6 +735,8 @@ class ForwardBot:
                     peer = await self.bot.resolve_peer(self.state['target_chat'].id)
                     current_max = end_id
                     batch_messages = []
+                    chunk_records = []
+                    chunk_complete = True
                     retry_count = 0
                     
                     while current_max >= start_id and not self.state['cancelled']:
@@ -212,6 +765,7 @@ class ForwardBot:
                                 
                             messages = [msg.id for msg in result.messages]
                             batch_messages.extend(messages)
+                            chunk_records.extend((msg.id, self._build_message_meta(msg)) for msg in result.messages)
                             
                             async with self.state['scan_lock']:
                                 self.state['scan_progress']['scanned'] += len(messages)
@@ -230,15 +784,26 @@ class ForwardBot:
                             retry_count += 1
                             if retry_count > 3:
                                 print(f"Failed after 3 retries: {e}")
+                                chunk_complete = False
                                 break
                             await asyncio.sleep(1)
                             continue
                     
+                    if self.state['cancelled']:
+                        chunk_complete = False
+                    
+                    chunk_meta = MessageMeta.build(chunk_records)
                     async with self.state['scan_lock']:
-                        self.state['scan_results'].extend(batch_messages)
+                        self.state['scan_results'].append(batch_messages)
+                        self.state['meta_parts'].append(chunk_meta)
+                        if chunk_complete:
+                            self._append_scan_checkpoint(start_id, end_id, batch_messages, chunk_meta)
+                        else:
+                            self.state['scan_incomplete'] = True
                     
                 except Exception as e:
                     print(f"Error scanning batch {start_id}-{end_id}: {e}")
+                    self.state['scan_incomplete'] = True
                 
                 self.state['scan_queue'].task_done()
                 self.state['worker_status'][worker_id] = "Idle"
@@ -302,13 +867,22 @@ class ForwardBot:
         temp_path = None
         thumb_path = None
         
+        reply_to = self._map_reply_to(message)
+
+        source_id = message.chat.id if message.chat else None
+        if message.has_protected_content or getattr(message.chat, 'has_protected_content', False):
+            self.restricted_chats.add(source_id)
+
         try:
-            try:
-                await message.copy(dest_chat.id)
-                await asyncio.sleep(self.FORWARD_DELAY)
-                return True
-            except Exception as copy_err:
-                print(f"Copy failed, trying download-upload: {copy_err}")
+            if source_id not in self.restricted_chats:
+                try:
+                    sent = await message.copy(dest_chat.id, reply_to_message_id=reply_to)
+                    await asyncio.sleep(self.FORWARD_DELAY)
+                    return self._record_sent(message.id, sent)
+                except Exception as copy_err:
+                    if "CHAT_FORWARDS_RESTRICTED" in str(copy_err):
+                        self.restricted_chats.add(source_id)
+                    print(f"Copy failed, trying download-upload: {copy_err}")
 
             file_ext = ".mp4" if message.video else ".jpg" if message.photo else ""
             temp_filename = f"media_{message.id}{file_ext}"
@@ -323,7 +897,7 @@ class ForwardBot:
             send_args = {
                 'caption': message.caption,
                 'caption_entities': message.caption_entities,
-                'reply_to_message_id': message.reply_to_message_id if message.reply_to_message_id else None
+                'reply_to_message_id': reply_to
             }
 
             if message.video:
@@ -348,7 +922,7 @@ class ForwardBot:
                     video_args['thumb'] = thumb_path
                 
                 try:
-                    await self.bot.send_video(dest_chat.id, temp_path, **video_args)
+                    sent = await self.bot.send_video(dest_chat.id, temp_path, **video_args)
                     await asyncio.sleep(self.FORWARD_DELAY)
                 finally:
                     if thumb_path and os.path.exists(thumb_path):
@@ -366,12 +940,14 @@ class ForwardBot:
                     except Exception as thumb_err:
                         print(f"Document thumbnail download failed: {thumb_err}")
                 
-                await self.bot.send_document(dest_chat.id, temp_path, **send_args)
+                sent = await self.bot.send_document(dest_chat.id, temp_path, **send_args)
                 await asyncio.sleep(self.FORWARD_DELAY)
             elif message.photo:
-                await self.bot.send_photo(dest_chat.id, temp_path, **send_args)
+                sent = await self.bot.send_photo(dest_chat.id, temp_path, **send_args)
                 await asyncio.sleep(self.FORWARD_DELAY)
-            return True
+            else:
+                return False
+            return self._record_sent(message.id, sent)
 
         except FloodWait as e:
             await asyncio.sleep(e.value)
@@ -391,48 +967,169 @@ class ForwardBot:
                 except:
                     pass
 
-    async def _forward_message(self, message_id: int, dest_chat) -> bool:
-        """Forward a single message by ID"""
+    async def _get_raw_message(self, chat_id: int, message_id: int):
+        """Fetch a single raw TL message without parsing it into a Message object"""
+        peer = await self.bot.resolve_peer(chat_id)
+        ids = [raw.types.InputMessageID(id=message_id)]
+        if isinstance(peer, raw.types.InputPeerChannel):
+            result = await self.bot.invoke(
+                raw.functions.channels.GetMessages(
+                    channel=raw.types.InputChannel(channel_id=peer.channel_id, access_hash=peer.access_hash),
+                    id=ids
+                )
+            )
+        else:
+            result = await self.bot.invoke(raw.functions.messages.GetMessages(id=ids))
+        return result.messages[0] if result.messages else None
+
+    @staticmethod
+    def _build_raw_send_request(raw_msg, dest_peer, reply_to_msg_id: int = None, random_id: int = 0):
+        """Build a SendMessage/SendMedia request reusing the raw media input, or None if unsupported"""
+        if not isinstance(raw_msg, raw.types.Message) or raw_msg.noforwards:
+            return None
+
+        media = raw_msg.media
+        if media is None or isinstance(media, raw.types.MessageMediaWebPage):
+            if not raw_msg.message:
+                return None
+            return raw.functions.messages.SendMessage(
+                peer=dest_peer,
+                message=raw_msg.message,
+                random_id=random_id,
+                no_webpage=media is None,
+                reply_to_msg_id=reply_to_msg_id,
+                entities=raw_msg.entities
+            )
+
+        if isinstance(media, raw.types.MessageMediaPhoto) and isinstance(media.photo, raw.types.Photo):
+            input_media = raw.types.InputMediaPhoto(
+                id=raw.types.InputPhoto(
+                    id=media.photo.id,
+                    access_hash=media.photo.access_hash,
+                    file_reference=media.photo.file_reference
+                ),
+                spoiler=media.spoiler
+            )
+        elif isinstance(media, raw.types.MessageMediaDocument) and isinstance(media.document, raw.types.Document):
+            input_media = raw.types.InputMediaDocument(
+                id=raw.types.InputDocument(
+                    id=media.document.id,
+                    access_hash=media.document.access_hash,
+                    file_reference=media.document.file_reference
+                ),
+                spoiler=media.spoiler
+            )
+        else:
+            return None
+
+        return raw.functions.messages.SendMedia(
+            peer=dest_peer,
+            media=input_media,
+            message=raw_msg.message or "",
+            random_id=random_id,
+            reply_to_msg_id=reply_to_msg_id,
+            entities=raw_msg.entities
+        )
+
+    @staticmethod
+    def _get_sent_message_id(updates):
+        """Extract the new message ID from a send result"""
+        if isinstance(updates, raw.types.UpdateShortSentMessage):
+            return updates.id
+        for update in getattr(updates, 'updates', []):
+            if isinstance(update, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage)):
+                return update.message.id
+        for update in getattr(updates, 'updates', []):
+            if isinstance(update, raw.types.UpdateMessageID):
+                return update.id
+        return None
+
+    async def _forward_message_raw(self, message_id: int, dest_chat):
+        """Forward on raw TL objects, returns None when the regular path should handle it"""
+        try:
+            raw_msg = await self._get_raw_message(self.state['target_chat'].id, message_id)
+            if self._is_duplicate(message_id, self._raw_fingerprint(raw_msg)):
+                return False
+            reply_header = getattr(raw_msg, 'reply_to', None)
+            source_reply_id = getattr(reply_header, 'reply_to_msg_id', None)
+            request = self._build_raw_send_request(
+                raw_msg,
+                await self.bot.resolve_peer(dest_chat.id),
+                reply_to_msg_id=self.state['id_map'].get(source_reply_id) if source_reply_id else None,
+                random_id=self.bot.rnd_id()
+            )
+            if request is None:
+                return None
+
+            updates = await self.bot.invoke(request)
+            await asyncio.sleep(self.FORWARD_DELAY)
+            sent_id = self._get_sent_message_id(updates)
+            if sent_id:
+                self._map_sent(message_id, sent_id)
+            return True
+        except FloodWait as e:
+            await asyncio.sleep(e.value)
+            return None
+        except Exception as e:
+            print(f"Raw fast path failed for {message_id}, using regular path: {e}")
+            return None
+
+    async def _forward_message(self, message_id: int, dest_chat, msg: Message = None) -> bool:
+        """Forward a single message by ID, reusing msg when already fetched"""
         if self.state['cancelled']:
             return False
 
         try:
-            msg = await self.bot.get_messages(self.state['target_chat'].id, message_id)
-            if not msg or msg.empty:
+            result = None
+            if msg is None and self.RAW_FAST_PATH and self.state['target_chat'].id not in self.restricted_chats:
                 self.state['message_status'][message_id] = {
-                    'status': 'skipped',
-                    'progress': 0
+                    'status': 'in_progress',
+                    'progress': 20
                 }
-                return False
+                result = await self._forward_message_raw(message_id, dest_chat)
+                if self.state['message_status'][message_id]['status'] == 'skipped':
+                    return False  # Duplicate of a destination message, not a failure
+
+            if result is None:
+                if msg is None:
+                    msg = await self.bot.get_messages(self.state['target_chat'].id, message_id)
+                if not msg or msg.empty:
+                    self.state['message_status'][message_id] = {
+                        'status': 'skipped',
+                        'progress': 0
+                    }
+                    return False
+                if self._is_duplicate(message_id, self._message_fingerprint(msg)):
+                    return False
                 
-            self.state['message_status'][message_id] = {
-                'status': 'in_progress',
-                'progress': 20
-            }
+                self.state['message_status'][message_id] = {
+                    'status': 'in_progress',
+                    'progress': 20
+                }
             
-            if msg.media:
-                result = await self._forward_media(msg, dest_chat)
-            elif msg.text:
-                try:
-                    await self.bot.send_message(
-                        dest_chat.id,
-                        msg.text,
-                        entities=msg.entities,
-                        reply_to_message_id=msg.reply_to_message_id if msg.reply_to_message_id else None
-                    )
-                    await asyncio.sleep(self.FORWARD_DELAY)
-                    result = True
-                except Exception as text_err:
-                    print(f"Error sending text message: {text_err}")
-                    result = False
-            else:
-                try:
-                    await msg.copy(dest_chat.id)
-                    await asyncio.sleep(self.FORWARD_DELAY)
-                    result = True
-                except Exception as copy_err:
-                    print(f"Error copying message: {copy_err}")
-                    result = False
+                if msg.media:
+                    result = await self._forward_media(msg, dest_chat)
+                elif msg.text:
+                    try:
+                        sent = await self.bot.send_message(
+                            dest_chat.id,
+                            msg.text,
+                            entities=msg.entities,
+                            reply_to_message_id=self._map_reply_to(msg)
+                        )
+                        await asyncio.sleep(self.FORWARD_DELAY)
+                        result = self._record_sent(message_id, sent)
+                    except Exception as text_err:
+                        print(f"Error sending text message: {text_err}")
+                        result = False
+                else:
+                    try:
+                        sent = await msg.copy(dest_chat.id, reply_to_message_id=self._map_reply_to(msg))
+                        await asyncio.sleep(self.FORWARD_DELAY)
+                        result = self._record_sent(message_id, sent)
+                    except Exception as copy_err:
+                        print(f"Error copying message: {copy_err}")
+                        result = False
             
             if result:
                 self.state['message_status'][message_id] = {
@@ -493,6 +1190,7 @@ class ForwardBot:
         while self.state['is_running'] and not self.state['cancelled']:
             try:
                 await self._update_progress(message)
+                self._save_id_map()
                 await asyncio.sleep(self.PROGRESS_UPDATE_INTERVAL)
             except Exception as e:
                 print(f"Progress updater error: {e}")
@@ -584,11 +1282,29 @@ class ForwardBot:
             i: "Waiting" for i in range(self.MAX_PARALLEL)
         }
         
-        self.state['message_status'] = {
-            msg_id: {'status': 'pending', 'progress': 0} 
-            for msg_id in self.state['message_ids']
-        }
+        if self.state['dedup']:
+            await message.reply_text("🔎 Indexing destination content...")
+            self.state['dest_index'] = await self._build_dest_index(dest)
         
+        # Skip messages already forwarded to this destination by earlier runs
+        self.state['id_map'] = self._load_id_map(self.state['target_chat'].id, dest.id)
+        self.state['message_status'] = {}
+        pending_ids = []
+        for msg_id in self.state['message_ids']:
+            meta = self.state['message_meta'].get(msg_id) or {}
+            if msg_id in self.state['id_map']:
+                self.state['message_status'][msg_id] = {'status': 'completed', 'progress': 100}
+                self.state['already_forwarded'] += 1
+            elif meta.get('type') in ('service', 'empty'):
+                # Known from the scan index to have nothing to forward, skip without fetching
+                self.state['message_status'][msg_id] = {'status': 'skipped', 'progress': 0}
+            elif self._is_duplicate(msg_id, meta.get('fp')):
+                continue
+            else:
+                self.state['message_status'][msg_id] = {'status': 'pending', 'progress': 0}
+                pending_ids.append(msg_id)
+        
+        started_at = time.time()
         self.state['workers'] = [
             asyncio.create_task(self._worker(i, dest))
             for i in range(self.MAX_PARALLEL)
@@ -598,7 +1314,7 @@ class ForwardBot:
             self._continuous_progress_updater(message)
         )
         
-        for msg_id in self.state['message_ids']:
+        for msg_id in pending_ids:
             await self.state['processing_queue'].put(msg_id)
         
         await self.state['processing_queue'].join()
@@ -608,6 +1324,13 @@ class ForwardBot:
         await asyncio.gather(*self.state['workers'], return_exceptions=True)
         
         self.state['is_running'] = False
+        self._save_id_map()
+        if not self.state['cancelled']:
+            self._record_throughput(
+                dest.id,
+                self.state['success_count'] + len(self.state['failed_messages']),
+                time.time() - started_at
+            )
         if self.state['progress_updater_task']:
             self.state['progress_updater_task'].cancel()
             try:
@@ -750,6 +1473,7 @@ class ForwardBot:
                 
                 self.state['message_ids'] = sorted(selected_ids)
                 self.state['step'] = 4
+                await message.reply_text(self._build_plan())
                 await message.reply_text(
                     "4. Delete successfully forwarded messages?\n"
                     "Send <code>delete</code> to enable deletion\n"
@@ -766,6 +1490,19 @@ class ForwardBot:
                 else:
                     raise ValueError("❌ Invalid option. Send 'delete' or 'keep'")
                 
+                self.state['step'] = 5
+                await message.reply_text(
+                    "5. Skip messages whose content is already in the destination?\n"
+                    "Send <code>dedup</code> to skip duplicates\n"
+                    "Send <code>all</code> to forward everything"
+                )
+
+            elif self.state['step'] == 5:
+                if text.lower() == 'dedup':
+                    self.state['dedup'] = True
+                elif text.lower() != 'all':
+                    raise ValueError("❌ Invalid option. Send 'dedup' or 'all'")
+                
                 await self._start_forwarding(message)
 
         except Exception as e:
@@ -785,20 +1522,26 @@ class ForwardBot:
             f"• Failed: {failed}"
         )
         
+        if self.state['already_forwarded']:
+            report += f"\n• Already forwarded (skipped): {self.state['already_forwarded']}"
+        if self.state['duplicate_count']:
+            report += f"\n• Already in destination (skipped): {self.state['duplicate_count']}"
+        
         if failed > 0:
             failed_ids = ', '.join(map(str, self.state['failed_messages']))
             report += f"\n\n❌ Failed IDs:\n{failed_ids}"
         
         if self.state['delete_after_forward']:
             deleted = len(self.state['deleted_messages'])
+            to_delete = success + self.state['already_forwarded']
             report += (
                 f"\n\n🗑️ Deletion Results:\n"
-                f"• Total to delete: {success}\n"
+                f"• Total to delete: {to_delete}\n"
                 f"• Successfully deleted: {deleted}\n"
-                f"• Failed to delete: {success - deleted}"
+                f"• Failed to delete: {to_delete - deleted}"
             )
             
-            if (success - deleted) > 0:
+            if (to_delete - deleted) > 0:
                 failed_deletes = [
                     msg_id for msg_id, status in self.state['message_status'].items()
                     if status.get('status') == 'completed' and not status.get('deleted', False)
@@ -819,7 +1562,7 @@ class ForwardBot:
             cache_file = self._get_cache_filename(chat_id, username)
             
             # Load existing cache if available
-            cached_ids, cached_min, cached_max = await self._load_cached_messages(chat_id, username)
+            cached_ids, cached_min, cached_max, cached_meta = await self._load_cached_messages(chat_id, username)
             
             # Get current newest message ID
             current_max_id = await self._get_newest_message_id(chat_id)
@@ -833,20 +1576,32 @@ class ForwardBot:
                 self.state['all_message_ids'] = cached_ids
                 self.state['min_id'] = cached_min
                 self.state['max_id'] = cached_max
+                self.state['message_meta'] = cached_meta
                 self.state['resume_scan'] = True
                 return cached_ids
             
-            # Initialize scan state
-            self.state['scan_results'] = []
-            self.state['min_id'] = cached_min if cached_min else None
-            self.state['max_id'] = current_max_id
-            
             # If we have existing cache, only scan new messages
             scan_min = cached_max + 1 if cached_max else 1
             scan_max = current_max_id
             
+            # Resume from chunks finished by an interrupted scan
+            checkpoint_file = self._get_checkpoint_filename(chat_id, username)
+            done_ranges, checkpoint_chunks, checkpoint_meta_parts = self._load_scan_checkpoint(checkpoint_file, scan_min)
+            missing_ranges = self._missing_ranges(scan_min, scan_max, done_ranges)
+            self._start_scan_checkpoint(checkpoint_file, scan_min)
+            
+            # Initialize scan state
+            self.state['scan_results'] = checkpoint_chunks
+            self.state['scan_incomplete'] = False
+            self.state['meta_parts'] = checkpoint_meta_parts
+            self.state['min_id'] = cached_min if cached_min else None
+            checkpoint_min = min((chunk[-1] for chunk in checkpoint_chunks if chunk), default=None)
+            if checkpoint_min and (not self.state['min_id'] or checkpoint_min < self.state['min_id']):
+                self.state['min_id'] = checkpoint_min
+            self.state['max_id'] = current_max_id
+            
             # Initialize progress tracking
-            total_to_scan = scan_max - scan_min + 1
+            total_to_scan = sum(end_id - start_id + 1 for start_id, end_id in missing_ranges)
             self.state['scan_progress'] = {
                 'scanned': 0,
                 'total': total_to_scan if total_to_scan > 0 else 1
@@ -864,15 +1619,15 @@ class ForwardBot:
             progress_task = asyncio.create_task(self._update_scan_progress(message))
             
             try:
-                # Divide the work into chunks
+                # Divide the missing ranges into chunks
                 chunk_size = self.SCAN_BATCH_SIZE
-                current_id = scan_max
-                
-                while current_id >= scan_min and not self.state['cancelled']:
-                    chunk_end = current_id
-                    chunk_start = max(scan_min, current_id - chunk_size + 1)
-                    await self.state['scan_queue'].put((chunk_start, chunk_end))
-                    current_id = chunk_start - 1
+                for range_start, range_end in missing_ranges:
+                    current_id = range_end
+                    while current_id >= range_start and not self.state['cancelled']:
+                        chunk_end = current_id
+                        chunk_start = max(range_start, current_id - chunk_size + 1)
+                        await self.state['scan_queue'].put((chunk_start, chunk_end))
+                        current_id = chunk_start - 1
             except Exception as e:
                 print(f"Error creating scan batches: {e}")
                 self.state['cancelled'] = True
@@ -897,28 +1652,35 @@ class ForwardBot:
                 pass
             
             if self.state['cancelled']:
-                raise ValueError("❌ Scan cancelled by user")
+                raise ValueError("❌ Scan cancelled by user, finished chunks are kept for the next scan")
+            if self.state['scan_incomplete']:
+                # Keep the checkpoint and leave the cache as is, so the next scan only queues the missing ranges
+                self.state['scan_results'] = []
+                self.state['meta_parts'] = []
+                raise ValueError("❌ Some message ranges could not be scanned, finished chunks are kept. Try again")
             
-            new_message_ids = sorted(list(set(self.state['scan_results'])))
+            # Chunks come back sorted descending, merge them with the cache without copies
+            all_message_ids = self._merge_sorted_ids(cached_ids, self.state['scan_results'])
+            self.state['scan_results'] = []
             
-            if not new_message_ids and not cached_ids:
+            if not all_message_ids:
                 raise ValueError("❌ No messages found after full scan")
             
             # Combine with cached messages if available
+            self.state['message_meta'] = MessageMeta.merge([cached_meta] + self.state['meta_parts'])
+            self.state['meta_parts'] = []
             if cached_ids:
-                all_message_ids = sorted(list(set(cached_ids + new_message_ids)))
                 min_id = min(cached_min, self.state['min_id']) if cached_min else self.state['min_id']
                 max_id = max(cached_max, self.state['max_id']) if cached_max else self.state['max_id']
             else:
-                all_message_ids = new_message_ids
                 min_id = self.state['min_id']
                 max_id = self.state['max_id']
+            del cached_ids
             
-            # Save/update cache
-            if cached_ids:
-                await self._update_cached_messages(chat_id, new_message_ids, min_id, max_id, username)
-            else:
-                await self._save_cached_messages(chat_id, all_message_ids, min_id, max_id, username)
+            await self._save_cached_messages(chat_id, all_message_ids, min_id, max_id, username,
+                                             meta=self.state['message_meta'])
+            
+            self._clear_scan_checkpoint(checkpoint_file)
             
             self.state['all_message_ids'] = all_message_ids
             self.state['min_id'] = min_id
@@ -11,6 +11,7 @@ class SecureBot:
         self.bot_username = "Saverestrictcontant2_bot"  
         self.combined = None
         self.forwarder = None
+        self.mirror = None
 
     async def initialize(self):
         """Initialize the bot client"""
@@ -31,8 +32,11 @@ class SecureBot:
         # Initialize modules
         import c_l
         from forward import ForwardBot
+        from mirror import MirrorBot
         self.combined = c_l.CombinedLinkForwarder(self.bot)
         self.forwarder = ForwardBot(self.bot)
+        self.mirror = MirrorBot(self.bot)
+        await self.combined.resume_from_journal()
 
     def is_bots_own_chat(self, message: Message):
         """Check if message is in bot's own chat"""
@@ -75,13 +79,19 @@ class SecureBot:
         "Available commands:\n"
         "/cl - Combined link clicker and forwarder\n"
           "/forward - forwarder\n"                      
+        "/mirror - Live mirror of new messages (/mirror stop to end)\n"
         "/cancel - Cancel current operation\n")
         elif message.text.startswith('/forward'):
             await self.forwarder.start_forward_setup(message)
+        elif message.text.startswith('/mirror'):
+            await self.mirror.start_mirror_setup(message)
         elif message.text.startswith('/cl'):
             await self.combined.start_combined_process(message)
         elif message.text.startswith('/cancel'):
             self.forwarder.reset_state()
+            # A running mirror is only stopped by /mirror stop
+            if self.mirror.state.get('active'):
+                self.mirror.reset_state()
             self.combined.reset_state()
             await message.reply("🛑 Operations cancelled")
 
@@ -89,6 +99,8 @@ class SecureBot:
         """Handle non-command messages in bot's chat"""
         if self.forwarder.state.get('active'):
             await self.forwarder.handle_setup_message(message)
+        elif self.mirror.state.get('active'):
+            await self.mirror.handle_setup_message(message)
         elif self.combined.state.get('active'):
             if not self.combined.state.get('destination_chat'):
                 await self.combined.handle_destination_input(message)
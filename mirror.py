@@ -0,0 +1,327 @@
+import os
+import asyncio
+import json
+import time
+from typing import List
+from pyrogram import Client, filters
+from pyrogram.types import Message
+from pyrogram.handlers import MessageHandler, EditedMessageHandler, DeletedMessagesHandler
+from pyrogram.errors import FloodWait
+from forward import ForwardBot
+
+class MirrorBot:
+    def __init__(self, bot: Client):
+        self.bot = bot
+        # Separate media dir so a running /forward job's temp files are untouched,
+        # but the same message_temp so both share the source->destination ID map
+        self.forwarder = ForwardBot(bot, media_dir_name="mirror_media_temp")
+        self.handlers = []
+        self.reset_state()
+
+        # Configuration
+        self.HANDLER_GROUP = 1
+        self.CATCHUP_BATCH_SIZE = 200
+        self.CATCHUP_INTERVAL = 60
+
+    def reset_state(self):
+        """Stop any running mirror and reset state"""
+        self._remove_handlers()
+        state = getattr(self, 'state', None)
+        if state:
+            for task in (state.get('worker_task'), state.get('catchup_task')):
+                if task and not task.done():
+                    task.cancel()
+        self.forwarder.reset_state()
+        self.state = {
+            'active': False,
+            'running': False,
+            'step': 0,
+            'source_chat': None,
+            'destination_chat': None,
+            'mirror_edits': False,
+            'mirror_deletes': False,
+            'last_id': 0,
+            'update_queue': asyncio.Queue(),
+            'worker_task': None,
+            'catchup_task': None,
+            'mirrored_count': 0,
+            'status_chat_id': None
+        }
+
+    def _get_state_filename(self, source_chat_id: int, dest_chat_id: int):
+        """Generate mirror state filename in message_temp directory"""
+        return os.path.join(self.forwarder.message_temp_dir, f"{source_chat_id}_to_{dest_chat_id}_mirror.json")
+
+    def _load_last_id(self, source_chat_id: int, dest_chat_id: int):
+        """Load last mirrored source message ID, None when this pair was never mirrored"""
+        state_file = self._get_state_filename(source_chat_id, dest_chat_id)
+        if os.path.exists(state_file):
+            try:
+                with open(state_file, 'r') as f:
+                    return json.load(f).get('last_id', 0)
+            except Exception as e:
+                print(f"Mirror state load error: {e}")
+        return None
+
+    def _save_last_id(self):
+        """Persist last mirrored source message ID"""
+        state_file = self._get_state_filename(self.state['source_chat'].id, self.state['destination_chat'].id)
+        data = {
+            'last_id': self.state['last_id'],
+            'timestamp': time.time()
+        }
+        try:
+            with open(state_file, 'w') as f:
+                json.dump(data, f)
+        except Exception as e:
+            print(f"Mirror state save error: {e}")
+
+    async def send_status(self, text: str):
+        """Send status updates to user"""
+        if self.state['status_chat_id']:
+            try:
+                await self.bot.send_message(self.state['status_chat_id'], text)
+            except Exception:
+                pass
+
+    def _add_handlers(self):
+        """Register update handlers for the source chat"""
+        source_filter = filters.chat(self.state['source_chat'].id)
+        self.handlers = [(MessageHandler(self._on_new_message, source_filter), self.HANDLER_GROUP)]
+        if self.state['mirror_edits']:
+            self.handlers.append((EditedMessageHandler(self._on_edited_message, source_filter), self.HANDLER_GROUP))
+        if self.state['mirror_deletes']:
+            self.handlers.append((DeletedMessagesHandler(self._on_deleted_messages, source_filter), self.HANDLER_GROUP))
+        for handler, group in self.handlers:
+            self.bot.add_handler(handler, group)
+
+    def _remove_handlers(self):
+        """Unregister update handlers"""
+        for handler, group in self.handlers:
+            try:
+                self.bot.remove_handler(handler, group)
+            except Exception as e:
+                print(f"Error removing mirror handler: {e}")
+        self.handlers = []
+
+    async def _on_new_message(self, client: Client, message: Message):
+        await self.state['update_queue'].put(('new', message))
+
+    async def _on_edited_message(self, client: Client, message: Message):
+        await self.state['update_queue'].put(('edit', message))
+
+    async def _on_deleted_messages(self, client: Client, messages: List[Message]):
+        await self.state['update_queue'].put(('delete', messages))
+
+    async def _mirror_message(self, message: Message, live: bool = False):
+        """Send one new source message through the forward path"""
+        if message.id <= self.state['last_id'] or message.id in self.forwarder.state['id_map']:
+            return
+        if live and message.id > self.state['last_id'] + 1:
+            # Updates were missed, replay the gap first so last_id only moves over a contiguous range
+            await self._catch_up(max_id=message.id - 1)
+        if not message.empty:
+            if await self.forwarder._forward_message(message.id, self.state['destination_chat'], msg=message):
+                self.state['mirrored_count'] += 1
+            else:
+                await self.send_status(f"⚠️ Failed to mirror message {message.id}")
+            self.forwarder._save_id_map()
+        self.state['last_id'] = message.id
+        self._save_last_id()
+
+    async def _mirror_edit(self, message: Message):
+        """Apply a source edit to the mirrored destination message"""
+        dest_id = self.forwarder.state['id_map'].get(message.id)
+        if not dest_id:
+            return
+        dest_chat_id = self.state['destination_chat'].id
+        try:
+            if message.text:
+                await self.bot.edit_message_text(dest_chat_id, dest_id, message.text, entities=message.entities)
+            elif message.media:
+                await self.bot.edit_message_caption(
+                    dest_chat_id, dest_id, message.caption or "", caption_entities=message.caption_entities
+                )
+        except Exception as e:
+            print(f"Error mirroring edit of {message.id}: {e}")
+
+    async def _mirror_deletes(self, messages: List[Message]):
+        """Delete mirrored copies of deleted source messages"""
+        dest_ids = self.forwarder._forget_sent([m.id for m in messages])
+        if not dest_ids:
+            return
+        try:
+            await self.bot.delete_messages(self.state['destination_chat'].id, dest_ids)
+            self.forwarder._save_id_map()
+        except Exception as e:
+            print(f"Error mirroring deletions: {e}")
+
+    async def _catch_up(self, max_id: int = None):
+        """Replay source messages newer than the last mirrored ID, up to max_id or the newest"""
+        source_id = self.state['source_chat'].id
+        newest_id = max_id or await self.forwarder._get_newest_message_id(source_id)
+        if not newest_id or newest_id <= self.state['last_id']:
+            return
+
+        current_id = self.state['last_id'] + 1
+        while current_id <= newest_id and self.state['running']:
+            batch_ids = list(range(current_id, min(current_id + self.CATCHUP_BATCH_SIZE, newest_id + 1)))
+            try:
+                messages = await self.bot.get_messages(source_id, batch_ids)
+            except FloodWait as e:
+                await asyncio.sleep(e.value)
+                continue
+            for message in messages:
+                if not self.state['running']:
+                    return
+                if message:
+                    await self._mirror_message(message)
+            self.state['last_id'] = max(self.state['last_id'], batch_ids[-1])
+            self._save_last_id()
+            current_id = batch_ids[-1] + 1
+
+    async def _periodic_catch_up(self):
+        """Queue a catch-up regularly in case updates were missed while disconnected"""
+        while self.state['running']:
+            await asyncio.sleep(self.CATCHUP_INTERVAL)
+            await self.state['update_queue'].put(('catchup', None))
+
+    async def _run_catch_up(self):
+        """Catch up, reporting failures instead of stopping the worker"""
+        try:
+            await self._catch_up()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Mirror catch-up error: {e}")
+            await self.send_status(f"⚠️ Mirror catch-up failed, retrying in {self.CATCHUP_INTERVAL}s: {str(e)}")
+
+    async def _update_worker(self):
+        """Apply queued updates in arrival order"""
+        await self._run_catch_up()
+        while self.state['running']:
+            kind, payload = await self.state['update_queue'].get()
+            try:
+                if kind == 'new':
+                    await self._mirror_message(payload, live=True)
+                elif kind == 'edit':
+                    await self._mirror_edit(payload)
+                elif kind == 'delete':
+                    await self._mirror_deletes(payload)
+                elif kind == 'catchup':
+                    await self._run_catch_up()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Mirror worker error: {e}")
+            finally:
+                self.state['update_queue'].task_done()
+
+    async def _start_mirror(self, message: Message):
+        """Start catch-up and live mirroring"""
+        source = self.state['source_chat']
+        dest = self.state['destination_chat']
+        self.forwarder.state.update({
+            'active': True,
+            'target_chat': source,
+            'destination_chat': dest,
+            'id_map': self.forwarder._load_id_map(source.id, dest.id)
+        })
+        last_id = self._load_last_id(source.id, dest.id)
+        first_start = last_id is None
+        if first_start:
+            # First mirror of this pair, start after the current newest message instead of replaying history
+            last_id = await self.forwarder._get_newest_message_id(source.id)
+            if last_id is None:
+                raise ValueError("❌ Could not access source chat messages")
+        self.state['last_id'] = last_id
+        if first_start:
+            self._save_last_id()
+        self.state['active'] = False
+        self.state['running'] = True
+
+        self._add_handlers()
+        self.state['worker_task'] = asyncio.create_task(self._update_worker())
+        self.state['catchup_task'] = asyncio.create_task(self._periodic_catch_up())
+
+        await message.reply_text(
+            f"🪞 <b>Mirroring started</b>\n\n"
+            f"• Source: {source.title if hasattr(source, 'title') else source.id}\n"
+            f"• Destination: {dest.title}\n"
+            f"• Catching up from ID: {self.state['last_id'] + 1}\n"
+            f"• Edits: {'on' if self.state['mirror_edits'] else 'off'}\n"
+            f"• Deletions: {'on' if self.state['mirror_deletes'] else 'off'}\n\n"
+            "Send /mirror stop to stop"
+        )
+
+    async def stop_mirror(self, message: Message):
+        """Stop live mirroring"""
+        if not self.state['running']:
+            await message.reply_text("ℹ️ No mirror is running")
+            return
+        mirrored = self.state['mirrored_count']
+        last_id = self.state['last_id']
+        self.reset_state()
+        await message.reply_text(
+            f"🛑 Mirroring stopped\n\n"
+            f"• Messages mirrored: {mirrored}\n"
+            f"• Last mirrored ID: {last_id}"
+        )
+
+    async def start_mirror_setup(self, message: Message):
+        """Start the mirror setup process"""
+        if message.text.strip().lower().endswith('stop'):
+            await self.stop_mirror(message)
+            return
+        self.reset_state()
+        self.state['active'] = True
+        self.state['step'] = 1
+        self.state['status_chat_id'] = message.chat.id
+        await message.reply_text(
+            "🪞 <b>Mirror Setup</b>\n\n"
+            "1. Send <b>SOURCE</b> chat (username/ID/URL):\n\n"
+            "Type /cancel to stop"
+        )
+
+    async def handle_setup_message(self, message: Message):
+        """Handle user input during setup"""
+        if not self.state['active']:
+            return
+
+        try:
+            text = message.text.strip()
+
+            if self.state['step'] == 1:
+                self.state['source_chat'] = await self.bot.get_chat(text)
+                self.state['step'] = 2
+                await message.reply_text("2. Send <b>DESTINATION</b> chat:")
+
+            elif self.state['step'] == 2:
+                dest = await self.bot.get_chat(text)
+                me = await self.bot.get_me()
+                try:
+                    member = await self.bot.get_chat_member(dest.id, me.id)
+                    if not member.privileges or not member.privileges.can_post_messages:
+                        raise ValueError("❌ Bot needs 'Post Messages' permission")
+                except Exception as e:
+                    raise ValueError(f"❌ Can't check bot permissions: {str(e)}")
+                self.state['destination_chat'] = dest
+                self.state['step'] = 3
+                await message.reply_text(
+                    "3. Select what to mirror:\n"
+                    "• <code>new</code> - New messages only\n"
+                    "• <code>edits</code> - New messages and edits\n"
+                    "• <code>full</code> - New messages, edits and deletions"
+                )
+
+            elif self.state['step'] == 3:
+                option = text.lower()
+                if option not in ('new', 'edits', 'full'):
+                    raise ValueError("❌ Invalid option. Send 'new', 'edits' or 'full'")
+                self.state['mirror_edits'] = option in ('edits', 'full')
+                self.state['mirror_deletes'] = option == 'full'
+                await self._start_mirror(message)
+
+        except Exception as e:
+            await message.reply_text(f"❌ Error: {str(e)}")
+            self.reset_state()